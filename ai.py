@@ -0,0 +1,260 @@
+import sys, math, timeit, collections
+import numpy as np
+import classes as c
+import games as g
+import bots
+import cli
+
+# difficulty: ticks looked ahead, sequences tried for each decision,
+# ticks between decisions and most seconds spent thinking in one tick
+levels = {
+	'easy':   (15, 4, 12, 0.002),
+	'normal': (25, 8, 10, 0.004),
+	'hard':   (35, 10, 8, 0.006)}
+levelNames = ['easy', 'normal', 'hard']
+
+# what we try holding: turn left, right or not, thrust or not, shoot or not
+macros = [turn | thrust | shoot
+	for turn in (0, g.ROTATE_LEFT, g.ROTATE_RIGHT)
+	for thrust in (0, g.THRUST)
+	for shoot in (0, g.SHOOT)]
+
+
+def onCourse(game, shooter, target, horizon=120):
+	'''How many bullets of shooter will pass within hitting distance of
+	target in the next horizon ticks, if both keep going straight'''
+	field = game.bullets
+	n = field.count
+	if n == 0 or shooter.color not in field.colors:
+		return 0
+	mine = (field.owner[:n] == field.colors.index(shooter.color)) & (field.ttl[:n] > 0)
+	if not mine.any():
+		return 0
+	x = field.x[:n][mine] - target.x
+	y = field.y[:n][mine] - target.y
+	vx = field.vx[:n][mine] - target.vx
+	vy = field.vy[:n][mine] - target.vy
+
+	# closest approach, not before now and not after the bullet is gone
+	speed = np.maximum(vx * vx + vy * vy, 1e-9)
+	time = np.clip(-(x * vx + y * vy) / speed, 0, np.minimum(horizon, field.ttl[:n][mine]))
+	x += vx * time
+	y += vy * time
+	return np.count_nonzero(x * x + y * y <= 8 * 8)
+
+
+class Planner(bots.Bot):
+	'''CPU player that tries out short sequences of actions by playing them
+	forward on a copy of the game (headless, set to a snapshot of the game)
+	with the other players doing what they did last, so wells, bullets
+	and collisions work out exactly as they will.
+
+	Thinking is spread over the ticks between decisions, so a decision is
+	made for where the game will be at the next one. Each tick plays on
+	with the sequences where it left off, never longer than the level
+	allows or past game.deadline (set by Game.loop for each frame). Energy
+	is moved between systems by a rule of thumb instead, that pays off
+	over a longer time than we look ahead.'''
+
+	# the slowest tick of the copy (with scoring) in this many of our own
+	# ticks is what we expect the next one to take
+	recent = 30
+
+	def __init__(self, level='normal', seed=None):
+		bots.Bot.__init__(self, seed)
+		self.level = level
+		self.depth, self.width, self.every, self.budget = levels[level]
+		self.plan = []
+		self.ticks = 0 # since we started on the decision
+
+		# the decision being worked on: it is for where the game will be
+		# once we played the next every ticks of the plan (the lead), which
+		# the copy plays first. Then sequences to try from there, tried ones
+		# (score, sequence) and how far we are into the one being played
+		self.copy = None
+		self.deciding = False
+		self.others = None
+		self.lead = None
+		self.start = None
+		self.untried = []
+		self.tried = []
+		self.sequence = None
+		self.played = 0
+
+		# the slowest tick of the copy in each of our last ticks, kept even
+		# when there was no time for any, so a slow one is forgotten again
+		self.stepTimes = collections.deque(maxlen=Planner.recent)
+		self.thinking = 0.0 # longest we thought in one tick
+
+	def act(self, game, index):
+		start = timeit.default_timer()
+		me = game.players[index]
+		if not self.deciding:
+			self.begin(game, me)
+		# starting on a decision counts against the same time
+		self.think(index, start, game.deadline)
+
+		action = self.plan.pop(0) if self.plan else 0
+		self.ticks += 1
+		if self.ticks == self.every:
+			# the game is where the decision is for, go with the best so far
+			# or start over if there was no time to try anything
+			if self.tried:
+				self.plan = max(self.tried)[1]
+			self.deciding = False
+
+		self.thinking = max(self.thinking, timeit.default_timer() - start)
+		return action | self.energy(me)
+
+	def begin(self, game, me):
+		'Starts on the decision for every ticks from now'
+		wells = [(well.x, well.y) for well in game.wells]
+		if self.copy is None or self.copy.__class__ is not game.__class__ or \
+				len(self.copy.players) != len(game.players) or \
+				wells != [(well.x, well.y) for well in self.copy.wells]:
+			self.copy = game.__class__(game.state, True, game.seed, len(game.players))
+		self.copy.setState(game.getState())
+		self.others = list(game.lastActions)
+		self.lead = (self.plan + [0] * self.every)[:self.every]
+		self.start = None
+		self.untried = self.candidates(me)
+		self.tried = []
+		self.sequence = self.lead
+		self.played = 0
+		self.ticks = 0
+		self.deciding = True
+
+	def candidates(self, me):
+		'''Sequences to try: what we are doing now (kept up) and random ones
+		of a macro held for a while and then another one'''
+		sequences = []
+		rest = self.plan[self.every:]
+		if rest:
+			sequences.append(rest + [rest[-1]] * (self.depth - len(rest)))
+		if me.system['jump'] >= 75:
+			sequences.append([g.JUMP] + [0] * (self.depth - 1))
+		while len(sequences) < self.width:
+			first = self.random.choice(macros)
+			second = self.random.choice(macros)
+			shield = g.SHIELD if self.random.random() < 0.2 else 0
+			hold = self.random.randrange(1, self.depth)
+			sequences.append([first | shield] * hold + [second] * (self.depth - hold))
+		return sequences
+
+	def think(self, index, start, deadline=None):
+		'Plays sequences on the copy until they are all tried or time is up'
+		stop = start + self.budget
+		if deadline is not None:
+			stop = min(stop, deadline)
+		expected = max(self.stepTimes or [0.0])
+		slowest = 0.0
+		copy = self.copy
+		actions = list(self.others)
+		now = timeit.default_timer()
+		# leaving room for the slowest tick lately, not the usual one
+		while now + max(expected, slowest) < stop and (self.sequence is not None or self.untried):
+			if self.sequence is None:
+				self.sequence = self.untried.pop(0)
+				self.played = 0
+				copy.setState(self.start)
+
+			actions[index] = self.sequence[self.played]
+			copy.step(actions)
+			self.played += 1
+			if self.played == len(self.sequence):
+				if self.start is None:
+					self.start = copy.getState()
+				else:
+					self.tried.append((self.score(copy, index), self.sequence))
+				self.sequence = None
+
+			last = now
+			now = timeit.default_timer()
+			slowest = max(slowest, now - last)
+		self.stepTimes.append(slowest)
+
+	def score(self, game, index):
+		'How good the game looks for us'
+		me = game.players[index]
+		enemy = self.enemy(game, index)
+		value = 1000.0 * me.lives + me.system['hull']
+		if enemy is None:
+			return value + 10000
+		value -= 1000.0 * enemy.lives + enemy.system['hull']
+
+		# bullets still on their way count as hits
+		value += 20 * onCourse(game, me, enemy) - 20 * onCourse(game, enemy, me)
+
+		# facing where the enemy is going, from a distance bullets get there
+		dx, dy = self.offset(game, me, enemy)
+		dist = math.hypot(dx, dy)
+		time = dist / 3.5
+		aim = c.getDeg(dx + (enemy.vx - me.vx) * time, dy + (enemy.vy - me.vy) * time)
+		value += 20 * math.cos(math.radians(bots.turn(me.rot, aim)))
+		value -= abs(dist - bots.Gunner.maxRange * 0.6) / 20
+
+		# stay clear of the wells, more so heading into one
+		for well in game.wells:
+			dx, dy = self.offset(game, me, well)
+			dist = math.hypot(dx, dy)
+			gap = dist - well.rad
+			if gap < 150:
+				closing = max(0, (dx * me.vx + dy * me.vy) / max(dist, 1))
+				value -= (150 - gap) * well.force * (1 + closing) / 5
+		return value + me.system['ammo'] / 20 + me.system['engine'] / 50
+
+	def energy(self, me):
+		'''Moves energy to the hull when it is low, to ammo or the engine
+		when they run out, a system is picked first (NEXT_SYSTEM)'''
+		if me.system['hull'] < 50:
+			target = 'hull'
+		elif me.system['ammo'] < 20:
+			target = 'ammo'
+		elif me.system['engine'] < 20:
+			target = 'engine'
+		else:
+			return 0
+		system = c.Player.system
+		# rate as a percentage, 50 is the default
+		if me.rate[target] / (c.Player.rate[target] / 50) >= 70:
+			return 0
+		if me.cursysnum != getattr(system, target):
+			return g.NEXT_SYSTEM
+		return g.ENERGY_UP
+
+
+def match(level, opponent, gameType='random', seed=0, maxTicks=5400):
+	'''Plays the planner (seat 1) against a bot headless, returns the
+	winner (see sweep), the ticks played and the longest thought'''
+	game = g.types[gameType](g.Arena(), True, seed)
+	players = [Planner(level, seed), bots.types[opponent](seed + 1)]
+	ticks = 0
+	while game.winner == False and ticks < maxTicks:
+		game.step([bot.act(game, i) for i, bot in enumerate(players)])
+		ticks += 1
+	one, two = game.players
+	if game.winner == False:
+		winner = -1
+	elif one.lives < 0 and two.lives < 0:
+		winner = 0
+	else:
+		winner = 2 if one.lives < 0 else 1
+	return winner, ticks, players[0].thinking
+
+
+def main(args):
+	'''python ai.py [--level hard] [--bot gunner] [--matches N] [--game classic]
+	plays the CPU player against a bot and tells how it did and the longest
+	it thought in one tick (it must stay under the level's budget)'''
+	option = cli.options(args)
+
+	level = option('--level', 'normal', str)
+	opponent = option('--bot', 'gunner', str)
+	matches = option('--matches', 4, int)
+	results = [match(level, opponent, option('--game', 'random', str), seed) for seed in range(matches)]
+	won = sum(1 for winner, ticks, thinking in results if winner == 1)
+	lost = sum(1 for winner, ticks, thinking in results if winner == 2)
+	print('%s against %s: won %d, lost %d of %d, longest thought %.2f ms (budget %.2f ms)' %
+		(level, opponent, won, lost, matches, 1000 * max(r[2] for r in results), 1000 * levels[level][3]))
+
+if __name__ == '__main__': main(sys.argv[1:])
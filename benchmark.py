@@ -0,0 +1,235 @@
+import os, sys, json, math, platform, timeit
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import numpy as np
+import pygame
+import classes as c
+import games as g
+import bots
+import cli
+import vecenv
+
+class WellsGame(g.RandomGame):
+	'A random game with a lot more wells than it would pick itself'
+
+	wells = 12
+
+	def initThings(self, players):
+		g.RandomGame.initThings(self, players)
+		while len([t for t in self.things if isinstance(t, c.GravityWell)]) < WellsGame.wells:
+			x, y = self.getLocation()
+			self.things.insert(0, c.GravityWell(x, y, self.random.randrange(0, 30),
+				self.random.uniform(2.5, 7.5)))
+
+
+class Scenario:
+	'''A game to time and what the players do in it. Players never run out
+	of lives, so the game never ends and every tick timed is a real one'''
+
+	drawn = True # has frames to time
+
+	def __init__(self, name, cls, players='random', bullets=0, ships=2, world=None):
+		self.name = name
+		self.cls = cls
+		self.players = players
+		self.bullets = bullets
+		self.ships = ships
+		self.world = world # size, None for the screen
+
+	def create(self, state, headless, seed=0):
+		state.worldSize = self.world
+		game = self.cls(state, headless, seed, self.ships)
+		self.random = np.random.RandomState(seed)
+		self.bots = [bots.RandomBot(seed * 2 + i) for i in range(len(game.players))]
+		return game
+
+	def prepare(self, game):
+		'Gets the game ready for the next tick (not timed), returns the actions'
+		for player in game.players:
+			if player.lives < 1:
+				player.lives = 3
+		if self.bullets:
+			self.fill(game)
+		if self.players == 'fire':
+			# turning while holding the trigger, never out of ammo
+			for player in game.players:
+				player.system['ammo'] = 100
+			return [g.SHOOT | g.ROTATE_RIGHT] * len(game.players)
+		return [bot.act(game, i) for i, bot in enumerate(self.bots)]
+
+	def fill(self, game):
+		'Tops the bullets up to self.bullets, going every which way'
+		field = game.bullets
+		WIDTH, HEIGHT = game.world.size
+		for i in range(self.bullets - field.count):
+			angle = self.random.uniform(0, 2 * math.pi)
+			speed = self.random.uniform(1, 4)
+			field.spawn(self.random.uniform(0, WIDTH), self.random.uniform(0, HEIGHT),
+				math.cos(angle) * speed, math.sin(angle) * speed, (255,255,255,250))
+
+
+class EnvScenario(Scenario):
+	'''count games of a VecEnv, a tick steps all of them. Games end and
+	start over like they do in training, nothing is drawn'''
+
+	drawn = False
+
+	def __init__(self, name, count, game='random'):
+		Scenario.__init__(self, name, None)
+		self.count = count
+		self.game = game
+
+	def create(self, state, headless, seed=0):
+		env = vecenv.VecEnv(self.count, self.game, seed=seed)
+		env.reset()
+		self.random = np.random.RandomState(seed)
+		self.actions = np.zeros((self.count, 2), dtype=np.int64)
+		return env
+
+	def prepare(self, env):
+		'Keys held for a while, then others (like vecenv.speed)'
+		bits = np.array([g.ROTATE_LEFT, g.ROTATE_RIGHT, g.THRUST, g.SHOOT, g.SHIELD])
+		change = self.random.rand(self.count, 2) < 0.05
+		fresh = (self.random.rand(self.count, 2, len(bits)) < 0.3).dot(bits)
+		self.actions = np.where(change, fresh, self.actions)
+		return self.actions
+
+
+scenarios = [
+	Scenario('classic', g.Game),
+	Scenario('wells', WellsGame),
+	Scenario('fire', g.Game, 'fire'),
+	Scenario('bullets1000', g.Game, bullets=1000),
+	Scenario('bullets5000', g.Game, bullets=5000),
+	Scenario('ffa16', g.RandomGame, ships=16),
+	Scenario('bigworld', g.RandomGame, ships=8, bullets=1000, world=(4096, 3072)),
+	EnvScenario('vecenv256', 256)]
+scenarioNames = [scenario.name for scenario in scenarios]
+
+def stats(times):
+	'Ticks or frames a second (from the median, the machine is noisy) and milliseconds'
+	times = np.array(times) * 1000
+	return {'rate': 1000.0 / np.median(times), 'mean': times.mean(),
+		'median': np.median(times), 'p95': np.percentile(times, 95), 'max': times.max()}
+
+def simulate(scenario, ticks, warmup=60):
+	'Times game.step in a headless game'
+	game = scenario.create(g.Arena(), True)
+	times = []
+	for tick in range(warmup + ticks):
+		actions = scenario.prepare(game)
+		start = timeit.default_timer()
+		game.step(actions)
+		if tick >= warmup:
+			times.append(timeit.default_timer() - start)
+	return stats(times)
+
+def render(scenario, frames, state, warmup=30):
+	'''Times drawing a frame and putting it on the (dummy) display, with a
+	tick between frames that is not timed'''
+	game = scenario.create(state, False)
+	game.invalidate()
+	times = []
+	for frame in range(warmup + frames):
+		game.step(scenario.prepare(game))
+		start = timeit.default_timer()
+		rects = game.display(state.screen)
+		if rects is None:
+			pygame.display.flip()
+		else:
+			pygame.display.update(rects)
+		if frame >= warmup:
+			times.append(timeit.default_timer() - start)
+	return stats(times)
+
+def run(names, ticks, frames, repeat=3):
+	'''Runs the scenarios called names, returns the results as a dict,
+	the fastest of repeat runs counts (the others were disturbed)'''
+	results = {}
+	state = None
+	if frames:
+		import spacewar as sw
+		pygame.init()
+		state = sw.State()
+		# the same size as a headless game, whatever settings.ini says, and
+		# 32 bit (the dummy driver defaults to 8 bit, which times palette
+		# conversion rather than drawing)
+		state.size = (state.width, state.height) = g.Arena().size
+		state.screen = pygame.display.set_mode(state.size, 0, 32)
+
+	for scenario in scenarios:
+		if scenario.name not in names:
+			continue
+		result = results[scenario.name] = {}
+		if ticks:
+			result['tick'] = max((simulate(scenario, ticks) for i in range(repeat)),
+				key=lambda stats: stats['rate'])
+		if frames and scenario.drawn:
+			result['frame'] = max((render(scenario, frames, state) for i in range(repeat)),
+				key=lambda stats: stats['rate'])
+		sys.stderr.write('%-12s %s\n' % (scenario.name, '  '.join('%s %.0f/s' %
+			(kind, result[kind]['rate']) for kind in ('tick', 'frame') if kind in result)))
+
+	return {'python': platform.python_version(), 'pygame': pygame.version.ver,
+		'numpy': np.__version__, 'machine': platform.platform(),
+		'depth': state.screen.get_bitsize() if state else None,
+		'ticks': ticks, 'frames': frames, 'repeat': repeat, 'results': results}
+
+def compare(baseline, current, tolerance):
+	'''Prints rates against the baseline, returns the regressions: rates
+	that dropped by more than tolerance (a fraction)'''
+	regressions = []
+	print('%-12s %-6s %10s %10s %8s' % ('scenario', 'kind', 'baseline', 'now', 'change'))
+	for name in scenarioNames:
+		if name not in baseline['results'] or name not in current['results']:
+			continue
+		for kind in ('tick', 'frame'):
+			if kind not in baseline['results'][name] or kind not in current['results'][name]:
+				continue
+			before = baseline['results'][name][kind]['rate']
+			now = current['results'][name][kind]['rate']
+			change = now / before - 1
+			flag = ''
+			if change < -tolerance:
+				flag = '  REGRESSION'
+				regressions.append((name, kind, change))
+			print('%-12s %-6s %10.0f %10.0f %+7.1f%%%s' % (name, kind, before, now, 100 * change, flag))
+	return regressions
+
+def main(args):
+	'''python benchmark.py [--scenarios classic,fire] [--ticks N] [--frames N] [--repeat N]
+	                       [--out file] [--compare baseline [current]] [--tolerance 0.1]
+	times ticks and frames a second for each scenario and saves them as
+	JSON (0 ticks or frames skips those), --compare checks them (or a run
+	saved before) against a baseline and fails when one got slower'''
+	option = cli.options(args)
+
+	names = option('--scenarios', ','.join(scenarioNames), str).split(',')
+	for name in names:
+		if name not in scenarioNames:
+			raise ValueError('no scenario called %s, there are %s' % (name, ', '.join(scenarioNames)))
+
+	if '--compare' in args:
+		at = args.index('--compare')
+		file = open(args[at + 1])
+		baseline = json.load(file)
+		file.close()
+		if at + 2 < len(args) and not args[at + 2].startswith('--'):
+			file = open(args[at + 2])
+			current = json.load(file)
+			file.close()
+		else:
+			current = run(names, option('--ticks', baseline['ticks']),
+				option('--frames', baseline['frames']), option('--repeat', baseline['repeat']))
+		regressions = compare(baseline, current, option('--tolerance', 0.1, float))
+		if regressions:
+			sys.exit(1)
+		return
+
+	result = run(names, option('--ticks', 600), option('--frames', 300), option('--repeat', 3))
+	out = option('--out', 'benchmark.json', str)
+	file = open(out, 'w')
+	json.dump(result, file, indent=1, sort_keys=True)
+	file.close()
+	print('saved to %s' % out)
+
+if __name__ == '__main__': main(sys.argv[1:])
@@ -0,0 +1,164 @@
+import math, random
+import classes as c
+import games as g
+
+def turn(rot, deg):
+	'Degrees to turn from facing rot to face deg, -180 to 180'
+	return (deg - rot + 540) % 360 - 180
+
+def steer(rot, deg, slack=5):
+	'The rotate action that turns rot towards deg, 0 if close enough'
+	diff = turn(rot, deg)
+	if diff > slack:
+		return g.ROTATE_RIGHT
+	if diff < -slack:
+		return g.ROTATE_LEFT
+	return 0
+
+
+class Bot:
+	'''Scripted player, act returns the action bitmask (see games) for
+	the player at index, like Game.readInput does for a person'''
+
+	def __init__(self, seed=None):
+		self.random = random.Random(seed)
+
+	def act(self, game, index):
+		return 0
+
+	def enemy(self, game, index):
+		'The closest other player still in the game'
+		me = game.players[index]
+		best = None
+		for i, other in enumerate(game.players):
+			if i != index and other.lives >= 0:
+				dist = self.offset(game, me, other)
+				dist = dist[0] * dist[0] + dist[1] * dist[1]
+				if best is None or dist < best[0]:
+					best = (dist, other)
+		return best and best[1]
+
+	def offset(self, game, me, other):
+		'Where other is as seen from me, across the edges if that is closer'
+		return (c.wrapped(other.x - me.x, game.world.width),
+			c.wrapped(other.y - me.y, game.world.height))
+
+	def avoidWells(self, game, me, margin=40, horizon=60):
+		'''Steers and thrusts away from a well we are falling into (or will
+		within horizon ticks), out sideways so we swing past it, or 0'''
+		for well in game.wells:
+			dx, dy = self.offset(game, me, well)
+			dist = math.hypot(dx, dy)
+			closing = (dx * me.vx + dy * me.vy) / max(dist, 1)
+			gap = dist - well.rad - margin
+			if gap < 0 or closing > 0 and gap < closing * horizon:
+				away = c.getDeg(-dx, -dy)
+				# the side we are already passing it on
+				side = 1 if dx * me.vy - dy * me.vx < 0 else -1
+				escape = away + side * 45
+				action = steer(me.rot, escape, 15)
+				if abs(turn(me.rot, escape)) < 60:
+					action |= g.THRUST
+				return action
+		return 0
+
+	def incoming(self, game, me, reach=40):
+		'If a bullet of someone else will be within reach of us next tick'
+		field = game.bullets
+		n = field.count
+		if n == 0:
+			return False
+		mine = field.colors.index(me.color) if me.color in field.colors else -1
+		x = field.x[:n] + field.vx[:n] - me.x - me.vx
+		y = field.y[:n] + field.vy[:n] - me.y - me.vy
+		near = (x * x + y * y < reach * reach) & (field.ttl[:n] > 0) & (field.owner[:n] != mine)
+		return bool(near.any())
+
+
+class RandomBot(Bot):
+	'Holds random keys for a while, knows nothing about the game'
+
+	bits = [g.ROTATE_LEFT, g.ROTATE_RIGHT, g.THRUST, g.SHOOT, g.SHIELD]
+
+	def __init__(self, seed=None):
+		Bot.__init__(self, seed)
+		self.action = 0
+
+	def act(self, game=None, index=0):
+		if self.random.random() < 0.05:
+			self.action = sum(bit for bit in RandomBot.bits if self.random.random() < 0.3)
+		return self.action
+
+
+class Gunner(Bot):
+	'''Turns towards where the enemy will be when a bullet gets there and
+	shoots, closes in when far away, shields against incoming bullets'''
+
+	# furthest away we shoot from
+	maxRange = 350
+
+	def act(self, game, index):
+		me = game.players[index]
+		action = self.avoidWells(game, me)
+		if action:
+			return action
+
+		enemy = self.enemy(game, index)
+		if enemy is None:
+			return 0
+		dx, dy = self.offset(game, me, enemy)
+		dist = math.hypot(dx, dy)
+
+		# lead the target by the time a bullet takes to get there
+		time = dist / 3.5
+		dx += (enemy.vx - me.vx) * time
+		dy += (enemy.vy - me.vy) * time
+		aim = c.getDeg(dx, dy)
+
+		action = steer(me.rot, aim)
+		if abs(turn(me.rot, aim)) < 10 and dist < Gunner.maxRange:
+			action |= g.SHOOT
+		if dist > Gunner.maxRange and abs(turn(me.rot, aim)) < 30 and self.random.random() < 0.3:
+			action |= g.THRUST
+		if self.incoming(game, me):
+			action |= g.SHIELD
+		return action
+
+
+class Dodger(Bot):
+	'''Keeps its distance and shoots from there, jumps away when it is
+	about to die'''
+
+	distance = 250
+
+	def act(self, game, index):
+		me = game.players[index]
+		if me.system['hull'] < 30 and me.system['jump'] >= 75:
+			return g.JUMP
+		action = self.avoidWells(game, me)
+		if action:
+			return action
+
+		enemy = self.enemy(game, index)
+		if enemy is None:
+			return 0
+		dx, dy = self.offset(game, me, enemy)
+		dist = math.hypot(dx, dy)
+		aim = c.getDeg(dx, dy)
+
+		if dist < Dodger.distance:
+			# run, turning away from the enemy
+			away = c.getDeg(-dx, -dy)
+			action = steer(me.rot, away, 20)
+			if abs(turn(me.rot, away)) < 45:
+				action |= g.THRUST
+		else:
+			action = steer(me.rot, aim)
+			if abs(turn(me.rot, aim)) < 8:
+				action |= g.SHOOT
+		if self.incoming(game, me, 30):
+			action |= g.SHIELD
+		return action
+
+
+types = {'idle': Bot, 'random': RandomBot, 'gunner': Gunner, 'dodger': Dodger}
@@ -0,0 +1,227 @@
+import pygame
+import numpy as np
+import classes as c
+import gravity
+
+class BulletField:
+	'''All bullets in play, kept as arrays (one entry per bullet) so that
+	moving, aging and hit testing them is done for all bullets at once'''
+
+	# not super happy with these explosion colors, but they'll have to do for now
+	n1 = [(192,122,0,192),(128,128,0,192), (128,128,0,128),(0,0,0,0),(0,0,0,0)]
+	n2 = [(192,122,0,192),(192,122,0,192),(128,128,0,192), (128,128,0,128),(0,0,0,0)]
+	n3 = [(192,128,0,128),(192,122,0,192),(192,122,0,192),(128,128,0,192), (128,128,0,128)]
+	n4 = [(128,64,0,192),(192,128,0,128),(192,122,0,192),(192,192,100,192),(192,192,192,192)]
+	n5 = [(128,64,0,192),(192,128,0,50),(192,122,0,128),(192,192,192,128),(192,192,192,128)]
+	exp = [n5,n4,n3,n2,n1] # going to be using negative indexes into this
+
+	names = ('x', 'y', 'vx', 'vy', 'px', 'py', 'ttl', 'owner')
+
+	life = 255 # ticks before a bullet explodes on its own
+	fuse = 5   # ticks an explosion is shown
+
+	def __init__(self, world, capacity=1024):
+		self.world = world # what bullets wrap around, see Game.world
+		self.count = 0
+		self.allocate(capacity)
+
+		# owners are stored as an index into the list of colors
+		self.colors = []
+		# by color rather than owner, a restored snapshot (see snapshot)
+		# can have the colors in another order
+		self.sprites = {}
+
+	def allocate(self, capacity):
+		'(Re)allocates the arrays, keeping the bullets we already have'
+		old = self.count
+		arrays = {}
+		arrays['x']     = np.zeros(capacity)
+		arrays['y']     = np.zeros(capacity)
+		arrays['vx']    = np.zeros(capacity)
+		arrays['vy']    = np.zeros(capacity)
+		arrays['px']    = np.zeros(capacity)
+		arrays['py']    = np.zeros(capacity)
+		arrays['ttl']   = np.zeros(capacity, dtype=np.int32)
+		arrays['owner'] = np.zeros(capacity, dtype=np.int32)
+
+		for name, array in arrays.iteritems():
+			if old > 0:
+				array[:old] = getattr(self, name)[:old]
+			setattr(self, name, array)
+		self.capacity = capacity
+
+	def __len__(self):
+		return self.count
+
+	def colorIndex(self, color):
+		if color not in self.colors:
+			self.colors.append(color)
+		return self.colors.index(color)
+
+	def spawn(self, x, y, vx, vy, color):
+		'Adds a bullet, which is moved once right away to clear the ship'
+		if self.count == self.capacity:
+			self.allocate(self.capacity * 2)
+
+		# first move, the same as update does for all bullets
+		width = self.world.width
+		height = self.world.height
+		x += vx
+		y += vy
+		if x > width:
+			x = 0
+		elif x < 0:
+			x = width
+		if y > height:
+			y = 0
+		elif y < 0:
+			y = height
+
+		i = self.count
+		self.x[i] = x
+		self.y[i] = y
+		self.vx[i] = vx
+		self.vy[i] = vy
+		self.px[i] = x
+		self.py[i] = y
+		self.ttl[i] = BulletField.life - 1
+		self.owner[i] = self.colorIndex(color)
+		self.count += 1
+
+	def remember(self):
+		'Stores where all bullets are at the start of a tick'
+		n = self.count
+		self.px[:n] = self.x[:n]
+		self.py[:n] = self.y[:n]
+
+	def clear(self):
+		self.count = 0
+
+	def applyGravity(self, wells):
+		'Vectorized version of GravityWell.update for all bullets'
+		n = self.count
+		if n == 0:
+			return
+		gravity.exact(wells, self.x[:n], self.y[:n], self.vx[:n], self.vy[:n])
+
+	def applyField(self, field):
+		'Applies the pull of a precomputed GravityField to all bullets'
+		n = self.count
+		if n == 0:
+			return
+		ax, ay = field.sample(self.x[:n], self.y[:n])
+		self.vx[:n] += ax
+		self.vy[:n] += ay
+
+	def collide(self, targets):
+		'''Vectorized version of bullets checking collisions against
+		players and gravity wells, in the order targets are given: the
+		distances to all of them are worked out at once and a bullet hits
+		the first one it is close enough to'''
+		n = self.count
+		if n == 0:
+			return
+		ttl = self.ttl[:n]
+		live = ttl > 0
+		targets = [t for t in targets if isinstance(t, (c.Player, c.GravityWell))]
+		if not live.any() or not targets:
+			return
+
+		# 12 radius of shield (bullets bounce off it), 5 of ship damage
+		radius = np.array([t.rad if isinstance(t, c.GravityWell) else 12 if t.shieldUp > 0 else 5
+			for t in targets])
+		dx = self.x[:n] - np.array([t.x for t in targets])[:, np.newaxis]
+		dy = self.y[:n] - np.array([t.y for t in targets])[:, np.newaxis]
+		hit = (dx * dx + dy * dy <= (radius * radius)[:, np.newaxis]) & live
+		hit &= np.cumsum(hit, axis=0) == 1
+
+		for i in np.flatnonzero(hit.any(axis=1)):
+			target = targets[i]
+			if isinstance(target, c.Player):
+				if target.shieldUp > 0:
+					push = 5.0
+					damage = 0
+				else:
+					push = 10.0
+					damage = 25
+				mine = hit[i]
+				hits = np.count_nonzero(mine)
+				target.push(self.vx[:n][mine].sum() / push, self.vy[:n][mine].sum() / push)
+				target.system['hull'] -= damage * hits
+				if damage:
+					target.hits += hits
+		ttl[hit.any(axis=0)] = 0
+
+	def update(self, width, height):
+		'Moves all bullets, wraps them around the screen and ages them'
+		n = self.count
+		if n == 0:
+			return
+		x = self.x[:n]
+		y = self.y[:n]
+		x += self.vx[:n]
+		y += self.vy[:n]
+		x[x > width] = 0
+		x[x < 0] = width
+		y[y > height] = 0
+		y[y < 0] = height
+
+		ttl = self.ttl[:n]
+		ttl -= 1
+
+		# remove finished explosions, keeping the order of the rest
+		keep = ttl >= -BulletField.fuse
+		if not keep.all():
+			left = np.count_nonzero(keep)
+			for name in BulletField.names:
+				array = getattr(self, name)
+				array[:left] = array[:n][keep]
+			self.count = left
+
+	def sprite(self, owner, ttl):
+		'Returns the cached image for a live (ttl 1) or exploding bullet'
+		# explosions look the same whoever fired
+		color = self.colors[owner] if ttl > 0 else None
+		key = (color, ttl)
+		image = self.sprites.get(key)
+		if image is None:
+			image = pygame.Surface((9, 9), flags=pygame.SRCALPHA, depth=32)
+			image.fill((0,0,0,0))
+			if ttl > 0:
+				pygame.draw.circle(image, color, (4, 4), 1)
+				pygame.draw.circle(image, (color[0], color[1], color[2], 125), (4, 4), 2)
+			else:
+				exp = BulletField.exp[ttl]
+				pygame.draw.circle(image, exp[0], (4, 4), 1, 1)
+				pygame.draw.circle(image, exp[1], (4, 4), 2, 1)
+				pygame.draw.circle(image, exp[2], (4, 4), 3, 1)
+				pygame.draw.circle(image, exp[3], (4, 4), 4, 1)
+			self.sprites[key] = image
+		return image
+
+	def display(self, surface, alpha=1.0, camera=None):
+		'''draws all bullets (alpha into the tick), or the ones camera sees,
+		returns the rects drawn to'''
+		n = self.count
+		x = self.x[:n]
+		y = self.y[:n]
+		if alpha < 1:
+			# like Movable.drawPos, don't smooth wrapping around
+			dx = x - self.px[:n]
+			dy = y - self.py[:n]
+			jump = (np.abs(dx) > c.Movable.maxStep) | (np.abs(dy) > c.Movable.maxStep)
+			x = np.where(jump, x, self.px[:n] + dx * alpha)
+			y = np.where(jump, y, self.py[:n] + dy * alpha)
+		ttls = np.clip(self.ttl[:n], -BulletField.fuse, 1)
+		owners = self.owner[:n]
+		if camera is not None:
+			x, y = camera.toView(x, y)
+			shown = (x > -4) & (x < camera.viewWidth + 4) & (y > -4) & (y < camera.viewHeight + 4)
+			x, y, ttls, owners = x[shown], y[shown], ttls[shown], owners[shown]
+		xs = x.astype(np.int32) - 4
+		ys = y.astype(np.int32) - 4
+
+		blit = surface.blit
+		sprite = self.sprite
+		return [blit(sprite(owner, ttl), (left, top))
+			for left, top, ttl, owner in zip(xs.tolist(), ys.tolist(), ttls.tolist(), owners.tolist())]
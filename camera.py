@@ -0,0 +1,109 @@
+import pygame
+import render
+import classes as c
+
+class Camera:
+	'''Shows part of a world bigger than the screen (it wraps around at the
+	edges, see Movable.update), following the ships and zooming out to keep
+	them all in view. The part shown is drawn at world scale into a view
+	surface, stars tiled behind it and only what is in view drawn, then
+	scaled to the screen: the cost goes with the screen, not the world.'''
+
+	# star tile, the world's wrap doesn't have to line up with it
+	tile = 512
+
+	# furthest we zoom out, the view is at most this many times the screen
+	minZoom = 0.5
+	# zoom is rounded to this, so the view surface doesn't change every frame
+	zoomStep = 1 / 16.0
+
+	# world pixels kept clear around the ships
+	margin = 200
+
+	# share of the way to where the camera should be that it moves each frame
+	ease = 0.1
+
+	def __init__(self, world, width, height, seed=0, density=38, whole=False):
+		self.world = world
+		self.whole = whole # always zoomed out as far as it goes
+		self.x = world.width / 2.0
+		self.y = world.height / 2.0
+		self.zoom = 1.0
+		self.stars = render.starfield(Camera.tile, Camera.tile, seed, density).convert()
+		self.view = None
+		self.resize(width, height)
+
+	def resize(self, width, height):
+		'Fits the view to a screen width x height'
+		self.width = width
+		self.height = height
+		# never more than the whole world, nothing shows up twice
+		self.lowest = max(float(width) / self.world.width, float(height) / self.world.height)
+		if self.whole:
+			self.highest = self.lowest
+		else:
+			self.lowest = max(Camera.minZoom, self.lowest)
+			self.highest = max(1.0, self.lowest)
+		self.zoom = min(max(self.zoom, self.lowest), self.highest)
+		self.setView()
+
+	def setView(self):
+		zoom = max(round(self.zoom / Camera.zoomStep) * Camera.zoomStep, self.lowest)
+		size = (int(self.width / zoom), int(self.height / zoom))
+		if self.view is None or self.view.get_size() != size:
+			self.view = pygame.Surface(size).convert()
+		self.viewWidth, self.viewHeight = size
+
+	def follow(self, things, ease=None):
+		'''Moves ease (of the way, by default Camera.ease) to the middle of
+		things, zoomed to fit them'''
+		if ease is None:
+			ease = Camera.ease
+		if not things:
+			return
+		W, H = self.world.width, self.world.height
+		# the middle, measured from one of them so the wrap doesn't split them
+		first = things[0]
+		dx = [c.wrapped(thing.x - first.x, W) for thing in things]
+		dy = [c.wrapped(thing.y - first.y, H) for thing in things]
+		x = first.x + sum(dx) / len(dx)
+		y = first.y + sum(dy) / len(dy)
+		spanx = max(dx) - min(dx) + 2 * Camera.margin
+		spany = max(dy) - min(dy) + 2 * Camera.margin
+		zoom = min(self.width / spanx, self.height / spany)
+		zoom = min(max(zoom, self.lowest), self.highest)
+		# where the view takes in the whole world it stays in the middle
+		if self.viewWidth >= W:
+			x = W / 2.0
+		if self.viewHeight >= H:
+			y = H / 2.0
+
+		self.x = (self.x + c.wrapped(x - self.x, W) * ease) % W
+		self.y = (self.y + c.wrapped(y - self.y, H) * ease) % H
+		self.zoom += (zoom - self.zoom) * ease
+		self.setView()
+
+	def toView(self, x, y):
+		'Where a point of the world is on the view surface'
+		return (c.wrapped(x - self.x, self.world.width) + self.viewWidth / 2.0,
+			c.wrapped(y - self.y, self.world.height) + self.viewHeight / 2.0)
+
+	def visible(self, x, y, reach):
+		'If something reach around x, y (on the view) shows'
+		return -reach < x < self.viewWidth + reach and -reach < y < self.viewHeight + reach
+
+	def draw(self, screen, drawer):
+		'''Draws the stars and (through drawer, given the view surface and
+		us) everything in view, scaled onto the screen'''
+		view = self.view
+		tile = Camera.tile
+		left = int(self.x - self.viewWidth / 2.0) % tile
+		top = int(self.y - self.viewHeight / 2.0) % tile
+		for x in range(-left, self.viewWidth, tile):
+			for y in range(-top, self.viewHeight, tile):
+				view.blit(self.stars, (x, y))
+		drawer(view, self)
+		if view.get_size() == screen.get_size():
+			screen.blit(view, (0,0))
+		else:
+			pygame.transform.scale(view, screen.get_size(), screen)
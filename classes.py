@@ -1,6 +1,9 @@
 import pygame, math, random
+import numpy as np
 from math import cos, sin
 import spacewar as sw
+import sprites
+import fonts
 
 def enum(*sequential, **named):
 	enums = dict(zip(sequential, range(len(sequential))), **named)
@@ -18,59 +21,132 @@ def getDeg(dx, dy):
 		deg = 360 - deg
 	return deg
 
+# unit vectors for the (whole degree) angles ships face, see unit()
+units = {}
+
+def unit(deg):
+	'Helper function that returns (cached) x and y of a unit vector at deg'
+	vec = units.get(deg)
+	if vec is None:
+		rad = math.radians(deg)
+		vec = units[deg] = (cos(rad), sin(rad))
+	return vec
+
+def wrapped(d, size):
+	'''Shortest way along one axis of the wrapping world, d being how far
+	one coordinate is from another (a number or an array)'''
+	half = size / 2.0
+	if isinstance(d, np.ndarray):
+		return d - np.where(d > half, size, 0) + np.where(d < -half, size, 0)
+	if d > half:
+		return d - size
+	if d < -half:
+		return d + size
+	return d
+
+
+def rebalance(rates, current, amount):
+	'''Moves amount of recharge rate to system current from the other four,
+	for many ships at once: rates has a row per ship with the rates of the
+	systems (in Player.system order), current and amount are one per ship
+	(or the same for all). Returns the new rates.
+
+	Amounts are in percent of the rate, 50% being the one in Player.rate,
+	and no rate goes below 0% or above 100%. What current takes (or gives)
+	comes evenly from the others, but the ones that can't give (or take)
+	their share are left out and the rest share it. Leaving out the one
+	with the least room first until the rest can is the same as trying
+	them in order and starting over without the first that can't.'''
+	rates = np.asarray(rates, dtype=float)
+	n = len(rates)
+	rows = np.arange(n)[:, np.newaxis]
+	current = np.zeros(n, dtype=int) + current
+	amount = np.zeros(n) + amount
+
+	scale = np.array([Player.rate[Player.system.reverse[i]] for i in range(5)]) / 50
+	percent = rates / scale
+	have = percent[rows[:, 0], current]
+	toadd = np.where(have + amount > 100, 100 - have, np.where(have + amount < 0, -have, amount))
+
+	# the other systems, least room first
+	others = np.array([[i for i in range(5) if i != j] for j in range(5)])[current]
+	values = percent[rows, others]
+	room = np.where(toadd[:, np.newaxis] > 0, values, 100 - values)
+	order = np.argsort(room, axis=1)
+	others = others[rows, order]
+	values = values[rows, order]
+
+	# how many are left out, if none can give their share nothing is moved
+	out = np.zeros(n, dtype=int)
+	leaving = np.ones(n, dtype=bool)
+	for j in range(4):
+		after = values[:, j] + -toadd / (4 - j)
+		leaving &= (after > 100) | (after < 0)
+		out += leaving
+	toadd[out == 4] = 0
+	adjust = -toadd / np.maximum(4 - out, 1)
+
+	given = (np.arange(4) >= out[:, np.newaxis]) & (toadd != 0)[:, np.newaxis]
+	result = rates.copy()
+	result[rows, others] = np.where(given, (values + adjust[:, np.newaxis]) * scale[others], rates[rows, others])
+	total = have + toadd
+	total = np.where(total > 100, 100, np.where(total < 0, 0, total))
+	result[rows[:, 0], current] = np.where(toadd != 0, total * scale[current], rates[rows[:, 0], current])
+	return result
+
 
 class Movable:
-	'Super class for movable game objects'
+	'Super class for movable game objects, velocity is kept as x and y parts'
+
+	# moving further than this in one tick is a jump, not movement
+	maxStep = 64
 
-	def __init__(self, x, y, vel, dir):
+	def __init__(self, world, x, y, vx, vy):
+		self.world = world # what we move in and wrap around, see Game.world
 		self.x = x
 		self.y = y
-		self.vel = vel
-		self.dir = dir
-
-	def resize(self, width, height):
-		oldW = Movable.state.width
-		newW = width
-		oldH = Movable.state.height
-		newH = height
-		
-		self.x = int((self.x / float(oldW)) * newW)
-		self.y = int((self.y / float(oldH)) * newH)
-		
+		self.vx = vx
+		self.vy = vy
+
+		# location at the start of the tick, for drawing in between ticks
+		self.px = x
+		self.py = y
+
+	def remember(self):
+		'Stores where we are at the start of a tick'
+		self.px = self.x
+		self.py = self.y
+
+	def drawPos(self, alpha):
+		'''Returns where to draw us alpha (0-1) of the way into the tick,
+		jumps (wrapping around, hyperjump, respawn) are not smoothed'''
+		dx = self.x - self.px
+		dy = self.y - self.py
+		if abs(dx) > Movable.maxStep or abs(dy) > Movable.maxStep:
+			return self.x, self.y
+		return self.px + dx * alpha, self.py + dy * alpha
 
 	def update(self):
-		rad = math.radians(self.dir)
-		dx = cos(rad) * self.vel
-		dy = sin(rad) * self.vel
-		self.x += dx
-		self.y += dy
-		if self.x > Movable.state.width:
+		self.x += self.vx
+		self.y += self.vy
+		if self.x > self.world.width:
 			self.x = 0
 		elif self.x < 0:
-			self.x = Movable.state.width
+			self.x = self.world.width
 
-		if self.y > Movable.state.height:
+		if self.y > self.world.height:
 			self.y = 0
 		elif self.y < 0:
-			self.y = Movable.state.height
+			self.y = self.world.height
 	
-	def applyForce(self, val, direction):
-		rad = math.radians(self.dir)
-		cur_dx = cos(rad) * self.vel
-		cur_dy = sin(rad) * self.vel
-		
-		rad = math.radians(direction)
-		new_dx = cos(rad) * val
-		new_dy = sin(rad) * val
+	def push(self, dx, dy):
+		'Applies a force given as x and y components'
+		self.vx += dx
+		self.vy += dy
 
-		dx = cur_dx + new_dx
-		dy = cur_dy + new_dy
-		self.vel = math.hypot(dx, dy)
-		self.dir = getDeg(dx, dy)
-
-		# do we need this?
-		#if self.vel < 0:
-		#	self.vel = 0
+	def applyForce(self, val, direction):
+		dx, dy = unit(direction)
+		self.push(dx * val, dy * val)
 
 
 class Player(Movable):
@@ -102,8 +178,14 @@ class Player(Movable):
 
 	system = enum('hull', 'ammo', 'shield', 'engine', 'jump')
 
-	def __init__(self, color, x, y, rot, uiLoc):
-		Movable.__init__(self, x, y, 0, 0)
+	# furthest anything can be from us and still collide (shield radius)
+	reach = 12
+
+	# size of the HUD (bars, letters and lives) in the top corner
+	hudSize = (180, 100)
+
+	def __init__(self, world, color, x, y, rot, uiLoc):
+		Movable.__init__(self, world, x, y, 0, 0)
 		self.color = color
 		self.rot = rot # angle we're facing
 
@@ -128,66 +210,40 @@ class Player(Movable):
 		self.shieldUp = 0
 		self.cursysnum = 0
 
+		# statistics, see sweep
+		self.hits = 0 # bullets that did damage
+		self.wellDeaths = 0
+
 		# UI elements for this player
-		font = pygame.font.SysFont('monospace', 12)
 		self.uicolor = self.color[0], self.color[1], self.color[2], 128
 		
 		self.uiLoc = uiLoc
 		if uiLoc == 'left':
-			self.barLoc = (20, 20)
-			self.livesLoc = (130, 25)
+			self.hudLoc = (0, 0)
 		elif uiLoc == 'right':
-			self.barLoc = (Movable.state.width - 120, 20)
-			self.livesLoc = (Movable.state.width - 130, 25)
-
-		self.uitext = []
-		self.uitext.append(font.render('H', 1, self.uicolor))
-		self.uitext.append(font.render('A', 1, self.uicolor))
-		self.uitext.append(font.render('S', 1, self.uicolor))
-		self.uitext.append(font.render('E', 1, self.uicolor))
-		self.uitext.append(font.render('J', 1, self.uicolor))
-
-	def drawBg(self, surface):
-		rect = pygame.Rect(self.barLoc[0], self.barLoc[1], 100, 10)
-		textx = self.barLoc[0] - 10
-		if self.uiLoc == 'right':
-			textx = self.barLoc[0] + 105
-
-		for sysnum in range(5):	
-			# draw containing rectangle
-			pygame.draw.rect(surface, self.uicolor, rect, 1)
-
-			# blit system letter
-			texty = rect.y - 1
-			surface.blit(self.uitext[sysnum], (textx, rect.y - 1))
-
-			# increment to draw next rect
-			rect.y += 15
-
-	def resize(self, width, height):
-		# reset current location
-		Movable.resize(self, width, height)
-
-		oldW = Movable.state.width
-		newW = width
-		oldH = Movable.state.height
-		newH = height
-		
-		# reset UI location
-		if self.uiLoc == 'right':
-			self.barLoc = (newW - 120, 20)
-			self.livesLoc = (newW - 130, 25)
-
-		# reset respawn location
-		self.orig['x'] = int((self.orig['x'] / float(oldW)) * newW)
-		self.orig['y'] = int((self.orig['y'] / float(oldH)) * newH)
+			self.hudLoc = (self.world.width - Player.hudSize[0], 0)
+
+		# the HUD is drawn into its own surface, which is only redrawn
+		# when something on it changes (see hudKey), and scaled to hudScale
+		self.hud = None
+		self.hudImage = None
+		self.hudKey = None
+		self.hudScale = 1.0
+
+	def placeHud(self, x, y, uiLoc, scale=1.0):
+		'Puts the HUD at x, y, mirrored if uiLoc is right (see Game.layoutHuds)'
+		self.hudLoc = (x, y)
+		self.uiLoc = uiLoc
+		self.hudScale = scale
+		self.hudKey = None
 
 	def reset(self):
 		self.lives -= 1
 		self.x = self.orig['x']
 		self.y = self.orig['y']
 		self.rot = self.orig['rot']
-		self.vel = 0
+		self.vx = 0
+		self.vy = 0
 
 		self.system['hull']   = 100
 		self.system['ammo']   = 100
@@ -201,12 +257,15 @@ class Player(Movable):
 		self.rate['engine'] = Player.rate['engine']
 		self.rate['jump']   = Player.rate['jump']
 
-	def applyForce(self, val, direction):
-		Movable.applyForce(self, val, direction)
+	def push(self, dx, dy):
+		Movable.push(self, dx, dy)
 
 		# players have a max speed
-		if self.vel > 5:
-			self.vel = 5
+		speed = self.vx * self.vx + self.vy * self.vy
+		if speed > 5 * 5:
+			scale = 5 / math.sqrt(speed)
+			self.vx *= scale
+			self.vy *= scale
 
 
 	def update(self, others=None):
@@ -247,19 +306,21 @@ class Player(Movable):
 			self.accelerating = 2
 			self.system['engine'] -= Player.use['engine']
 
-	def shoot(self):
+	def shoot(self, bullets):
+		'Fires a bullet into the given BulletField, returns if we did'
 		if self.shooting == 0 and self.system['ammo'] >= 2:
-			rad = math.radians(self.rot)
-			x = self.x + math.cos(rad) * 7
-			y = self.y + math.sin(rad) * 7
-			
-			b = Bullet(x, y, self.vel, self.dir, self.color)
-			b.applyForce(3.5, self.rot)
-			b.update()
+			dx, dy = unit(self.rot)
+			x = self.x + dx * 7
+			y = self.y + dy * 7
+
+			# bullets leave with our velocity plus a kick forward
+			vx = self.vx + dx * 3.5
+			vy = self.vy + dy * 3.5
+			bullets.spawn(x, y, vx, vy, self.color)
 
 			self.shooting = 3
 			self.system['ammo'] -= Player.use['ammo']
-			return b
+			return True
 		else:
 			return False
 
@@ -268,78 +329,23 @@ class Player(Movable):
 			self.shieldUp = 2 # will be reduced by 1 before display
 			self.system['shield'] -= Player.use['shield']
 
-	def hyperjump(self):
+	def hyperjump(self, rng=random):
 		# Question: should we maintain velocity after jumping?
 		# Answer: not sure, we'll say yes for now
 		if self.system['jump'] >= 75: 
-			self.x = random.randrange(0, Movable.state.width)
-			self.y = random.randrange(0, Movable.state.height)
+			self.x = rng.randrange(0, self.world.width)
+			self.y = rng.randrange(0, self.world.height)
 			self.system['jump'] -= Player.use['jump']
 
 	def nextsystem(self, inc=1):
 		self.cursysnum = (self.cursysnum + inc) % 5
 
-	def __adjustenergy(self, systemnum, amount, test=False):
-		'''private helper function takes system number, amount
-		and whether it should just test or actually do it
-		returns how much actually adjusted'''
-
-		# get system name from system number
-		system = Player.system.reverse[systemnum]
-
-		# normalize the rate into range 0-100
-		rate = self.rate[system] / (Player.rate[system] / 50)
-
-		added = amount
-		if rate + amount > 100:
-			added = 100 - rate
-			rate = 100
-		elif rate + amount < 0:
-			added = -rate
-			rate = 0
-		else:
-			rate += amount
-
-		# convert back and store
-		if test != True:
-			self.rate[system] = rate * (Player.rate[system] / 50)
-
-		return added
-	
 	def energy(self, amount=1):
-		# test how much we can add
-		toadd = self.__adjustenergy(self.cursysnum, amount, test=True)
-		
-		# exit out if we're not doing anything anyway
-		if toadd == 0:
-			return
-
-		# toadd needs to come from other systems' energy
-		ignored = [self.cursysnum]
-		removed = False
-
-		while not removed:
-			adjust = float(-toadd) / (5 - len(ignored))
-			cando = True
-
-			# find systems that can support adjustment
-			for i in range(5):
-				if i not in ignored:
-					possible = self.__adjustenergy(i, adjust, test=True)
-					if possible != adjust:
-						ignored.append(i)
-						cando = False
-						break; # and try with less systems
-
-			# actually do it
-			if cando:
-				for i in range(5):
-					if i not in ignored:
-						self.__adjustenergy(i, adjust)
-				removed = True
-
-		self.__adjustenergy(self.cursysnum, toadd)
-
+		'Moves amount (percent) of recharge rate to the current system from the others'
+		names = [Player.system.reverse[i] for i in range(5)]
+		rates = rebalance([[self.rate[name] for name in names]], self.cursysnum, amount)
+		for name, rate in zip(names, rates[0].tolist()):
+			self.rate[name] = rate
 
 	def checkCollision(self, other):
 		if other != self and isinstance(other, Player):
@@ -357,12 +363,8 @@ class Player(Movable):
 			if dist <= 0:
 				# the length of the collision vector 
 				# is with how much force they hit
-				dxa = cos(math.radians(self.dir)) * self.vel
-				dya = sin(math.radians(self.dir)) * self.vel
-				dxb = cos(math.radians(other.dir)) * other.vel
-				dyb = sin(math.radians(other.dir)) * other.vel
-				dx = dxa - dxb
-				dy = dya - dyb
+				dx = self.vx - other.vx
+				dy = self.vy - other.vy
 				length = math.hypot(dx, dy)
 
 				# do damage based on the force mutiplied by 5
@@ -370,19 +372,19 @@ class Player(Movable):
 				# when shields are up just bounce, no shield half bounce
 				if self.shieldUp > 0 and other.shieldUp > 0:
 					# bounce away from each other
-					other.vel, self.vel = self.vel, other.vel
-					other.dir, self.dir = self.dir, other.dir
+					other.vx, self.vx = self.vx, other.vx
+					other.vy, self.vy = self.vy, other.vy
 				elif self.shieldUp	> 0 and other.shieldUp == 0:
-					other.vel, self.vel = self.vel*0.5, other.vel
-					other.dir, self.dir = self.dir, other.dir
+					other.vx, self.vx = self.vx*0.5, other.vx
+					other.vy, self.vy = self.vy*0.5, other.vy
 					other.system['hull'] -= length * 5
 				elif self.shieldUp == 0 and other.shieldUp > 0:
-					other.vel, self.vel = self.vel, other.vel*0.5
-					other.dir, self.dir = self.dir, other.dir
+					other.vx, self.vx = self.vx, other.vx*0.5
+					other.vy, self.vy = self.vy, other.vy*0.5
 					self.system['hull'] -= length * 5 
 				else: # self.shieldUp == 0 and other.shieldUp == 0
-					other.vel, self.vel = self.vel*0.5, other.vel*0.5
-					other.dir, self.dir = self.dir, other.dir
+					other.vx, self.vx = self.vx*0.5, other.vx*0.5
+					other.vy, self.vy = self.vy*0.5, other.vy*0.5
 					self.system['hull'] -= length * 5 
 					other.system['hull'] -= length * 5
 
@@ -395,6 +397,7 @@ class Player(Movable):
 			dy = self.y - other.y
 			hyp = math.hypot(dx, dy)
 			if hyp <= other.rad:
+				self.wellDeaths += 1
 				self.reset()
 
 	@staticmethod
@@ -413,8 +416,9 @@ class Player(Movable):
 			point[1] += y
 
 	@staticmethod
-	def renderShip(surface, (x,y), rot, color, accel=False):
-		'static helper method to draw a ship at a specific location'
+	def renderShip(surface, (x,y), rot, color, accel=False, antialias=False):
+		'''static helper method to draw a ship at a specific location,
+		used to fill the sprite cache (see sprites.ShipSprites)'''
 
 		points = []
 		# first define the points relative to our x and y
@@ -428,6 +432,8 @@ class Player(Movable):
 
 		# draw player at current location
 		pygame.draw.polygon(surface, color, points)
+		if antialias:
+			pygame.draw.aalines(surface, color, True, points)
 
 		# draw flame for acceleration
 		if accel > 0:
@@ -438,6 +444,8 @@ class Player(Movable):
 			points.append([-4,1])
 			Player.rotateAndMove(points, rot, (x,y))
 			pygame.draw.polygon(surface, (225,225,0), points)
+			if antialias:
+				pygame.draw.aalines(surface, (225,225,0), True, points)
 
 	def drawSystemEnergy(self, surface, rect, sysnum): 
 		# get system name from number
@@ -445,7 +453,7 @@ class Player(Movable):
 		
 		# draw power level for this system
 		color = self.uicolor
-		if system != 'hull' and self.system[system] < Player.use[system]:
+		if not self.ready(system):
 			color = Player.notReady
 		power = pygame.Rect(rect.x, rect.y, self.system[system], 10) 
 		pygame.draw.rect(surface, color, power)
@@ -456,138 +464,160 @@ class Player(Movable):
 		if sysnum == self.cursysnum:
 			color = Player.selectedRateColor
 		pygame.draw.line(surface, color, (rect.x, rect.y + 12), (rect.x + rate, rect.y + 12))
-		
 
-	def display(self, surface):
-		# draw player ship at current location
-		if self.lives >= 0:
-			Player.renderShip(surface, (self.x,self.y), self.rot, self.color, self.accelerating)
+	def ready(self, system):
+		'If system has the energy to be used, the hull always is'
+		return system == 'hull' or self.system[system] >= Player.use[system]
+
+	def getHudKey(self):
+		'Everything shown on the HUD, rounded to the pixels it is drawn with'
+		key = [self.cursysnum, self.lives]
+		scale = self.hudScale
+		for sysnum in range(5):
+			system = Player.system.reverse[sysnum]
+			key.append(int(self.system[system] * scale))
+			# the bar turns grey below what using it takes
+			key.append(self.ready(system))
+			key.append(int(50 / Player.rate[system] * self.rate[system] * scale))
+		return tuple(key)
+
+	def renderHud(self):
+		'''Draws frames, letters, energy bars and lives into the HUD surface,
+		mirrored for a HUD on the right side of the screen'''
+		if self.hud is None:
+			self.hud = pygame.Surface(Player.hudSize, flags=pygame.SRCALPHA, depth=32)
+		surface = self.hud
+		surface.fill((0,0,0,0))
+
+		# health bar, letters and extra lives locations
+		barx, bary = 20, 20
+		textx = 10
+		livesx, livesy = 130, 25
+		livesdx = 10
+		if self.uiLoc == 'right':
+			barx = 60
+			textx = 165
+			livesx = 50
+			livesdx = -10
 
-		# draw shield around player if shield is on
-		if self.shieldUp > 0:
-			pygame.draw.circle(surface, (255,255,255), (int(self.x), int(self.y)), 12, 1)
+		rect = pygame.Rect(barx, bary, 100, 10)
+		for sysnum in range(5):	
+			# draw containing rectangle
+			pygame.draw.rect(surface, self.uicolor, rect, 1)
 
-		# health bar location for this player
-		barx = self.barLoc[0]
-		bary = self.barLoc[1]
+			# blit system letter
+			letter = Player.system.reverse[sysnum][0].upper()
+			surface.blit(fonts.render(letter, self.uicolor, 12), (textx, rect.y - 1))
 
-		# draw extra lives for this player
-		livesx = self.livesLoc[0]
-		livesy = self.livesLoc[1]
-		livesdx = 10
-		if livesx < barx:
-			livesdx = -10
+			# draw the power level for the system
+			self.drawSystemEnergy(surface, rect, sysnum)
+
+			# increment to draw next rect
+			rect.y += 15
 
 		# draw one ship for each extra live
 		for i in range(self.lives):
-			# TODO check that this doesn't take too much computing
-			# could make the default rotation up, might save some cycles
-			Player.renderShip(surface, (livesx, livesy), 270, self.uicolor)
+			sprites.ships.draw(surface, (livesx, livesy), 270, self.uicolor)
 			livesx += livesdx
 
-		# draw the power levels for the different ship systems
-		rect = pygame.Rect(barx, bary, 100, 10) 
-		for i in range(5):
-			self.drawSystemEnergy(surface, rect, i)
-			rect.y += 15
+		self.hudImage = surface
+		if self.hudScale != 1.0:
+			w, h = Player.hudSize
+			self.hudImage = pygame.transform.smoothscale(surface,
+				(int(w * self.hudScale), int(h * self.hudScale)))
+
+	def display(self, surface, alpha=1.0, camera=None):
+		'''draws ship (alpha into the tick) and HUD, or only the ship as seen
+		through camera (see Game.display), returns the rects drawn to'''
+		drawn = []
+		x, y = self.drawPos(alpha)
+		if camera is not None:
+			x, y = camera.toView(x, y)
+			if not camera.visible(x, y, sprites.ShipSprites.size):
+				return drawn
+
+		# draw player ship at current location
+		if self.lives >= 0:
+			drawn.append(sprites.ships.draw(surface, (x,y), self.rot, self.color, self.accelerating))
+
+		# draw shield around player if shield is on
+		if self.shieldUp > 0:
+			drawn.append(pygame.draw.circle(surface, (255,255,255), (int(x), int(y)), 12, 1))
+
+		if camera is None:
+			drawn.append(self.displayHud(surface))
+		return drawn
+
+	def displayHud(self, surface):
+		'draws the HUD, returns the rect drawn to'
+		# only redraw the HUD when something on it changed
+		key = self.getHudKey()
+		if key != self.hudKey:
+			self.renderHud()
+			self.hudKey = key
+		return surface.blit(self.hudImage, self.hudLoc)
 
 
 class GravityWell(Movable):
+	# images of wells by radius, for drawing them somewhere else than
+	# the background (see display)
+	images = {}
+
 	def __init__(self, x, y, rad, force):
 		self.x = x
 		self.y = y
 		self.rad = rad
+		self.reach = rad
 		self.force = force
 
 	def update(self, others):
 		for other in others:
-			force = self.force
 			dx = self.x - other.x
 			dy = self.y - other.y
-			dist = math.hypot(dx, dy)
+			dist = dx * dx + dy * dy
+
+			# the pull gravity.exact adds up over the wells, for one object
 			if dist != 0:
-				force = force / (dist/2)
-			angle = getDeg(dx, dy)
-			other.applyForce(force, angle)
+				scale = 2 * self.force / dist
+				other.push(dx * scale, dy * scale)
+			else:
+				other.push(self.force, 0)
 
-	def applyForce(self, vel, dir):
+	def push(self, dx, dy):
 		pass
 
 	def checkCollision(self, other):
 		pass
 
 	def drawBg(self, surface):
-		pygame.draw.circle(surface, (0, 0, 0), (self.x, self.y), self.rad)
-		pygame.draw.circle(surface, (255,255,255), (self.x, self.y), self.rad, 1)
-		pygame.draw.circle(surface, (200,200,200), (self.x, self.y), self.rad + 1, 1)
-		pygame.draw.circle(surface, (150,150,150), (self.x, self.y), self.rad + 2, 1)
-		pygame.draw.circle(surface, (100,100,100), (self.x, self.y), self.rad + 3, 1)
-		pygame.draw.circle(surface, (55,55,55), (self.x, self.y), self.rad + 4, 1)
-		pygame.draw.circle(surface, (25,25,25), (self.x, self.y), self.rad + 5, 1)
-
-	def display(self, surface):
-		pass # already on Background 
-
-
-class Bullet(Movable):
-	# not super happy with these explosion colors, but they'll have to do for now
-	n1 = [(192,122,0,192),(128,128,0,192), (128,128,0,128),(0,0,0,0),(0,0,0,0)]
-	n2 = [(192,122,0,192),(192,122,0,192),(128,128,0,192), (128,128,0,128),(0,0,0,0)]
-	n3 = [(192,128,0,128),(192,122,0,192),(192,122,0,192),(128,128,0,192), (128,128,0,128)]
-	n4 = [(128,64,0,192),(192,128,0,128),(192,122,0,192),(192,192,100,192),(192,192,192,192)]
-	n5 = [(128,64,0,192),(192,128,0,50),(192,122,0,128),(192,192,192,128),(192,192,192,128)]
-	exp = [n5,n4,n3,n2,n1] # going to be using negative indexes into this
-
-	def __init__(self, x, y, vel, dir, color):
-		Movable.__init__(self, x, y, vel, dir)
-		self.color = color
-		self.ttl = 255
-
-	def display(self, surface):
-		color = self.color
-		if self.ttl > 0:
-			pygame.draw.circle(surface, color, (int(self.x), int(self.y)), 1)
-			pygame.draw.circle(surface, (color[0], color[1], color[2], 125), (int(self.x), int(self.y)), 2)
-		elif self.ttl <= 0:
-			pygame.draw.circle(surface, Bullet.exp[self.ttl][0], (int(self.x), int(self.y)), 1, 1)
-			pygame.draw.circle(surface, Bullet.exp[self.ttl][1], (int(self.x), int(self.y)), 2, 1)
-			pygame.draw.circle(surface, Bullet.exp[self.ttl][2], (int(self.x), int(self.y)), 3, 1)
-			pygame.draw.circle(surface, Bullet.exp[self.ttl][3], (int(self.x), int(self.y)), 4, 1)
-			#pygame.draw.circle(surface, Bullet.exp[self.ttl][4], (int(self.x), int(self.y)), 5, 1)
-
-	def update(self, others=None):
-		Movable.update(self)
-		self.ttl -= 1
-		if self.ttl < -5:
-			others.remove(self)
-
-	def checkCollision(self, other):
-		if self.ttl > 0: # only bullets that are not exploding
-			if isinstance(other, Player):
-				dx = self.x - other.x
-				dy = self.y - other.y
-				dist = math.hypot(dx, dy)
-
-				if other.shieldUp > 0:
-					# 12 radius of shield?
-					# this also means that own bullets (being shot)
-					# can not go from inside to outside shield
-					if dist <= 12:
-						other.applyForce(self.vel / 5, self.dir)
-						if self.ttl > 0:
-							self.ttl = 0
-				else: # noshield
-					# 5 radius is ship damage?
-					if dist <= 5: 
-						other.applyForce(self.vel / 10, self.dir)
-						other.system['hull'] -= 25
-						if self.ttl > 0:
-							self.ttl = 0
-
-			if isinstance(other, GravityWell):
-				dx = self.x - other.x
-				dy = self.y - other.y
-				dist = math.hypot(dx, dy)
-				if dist <= other.rad and self.ttl > 0:
-					self.ttl = 0
-		
+		self.drawAt(surface, (self.x, self.y))
+
+	def drawAt(self, surface, (x, y)):
+		# a well can be just a point, pygame won't draw a 1 wide circle of radius 0
+		if self.rad > 0:
+			pygame.draw.circle(surface, (0, 0, 0), (x, y), self.rad)
+			pygame.draw.circle(surface, (255,255,255), (x, y), self.rad, 1)
+		pygame.draw.circle(surface, (200,200,200), (x, y), self.rad + 1, 1)
+		pygame.draw.circle(surface, (150,150,150), (x, y), self.rad + 2, 1)
+		pygame.draw.circle(surface, (100,100,100), (x, y), self.rad + 3, 1)
+		pygame.draw.circle(surface, (55,55,55), (x, y), self.rad + 4, 1)
+		pygame.draw.circle(surface, (25,25,25), (x, y), self.rad + 5, 1)
+
+	def remember(self):
+		pass # never moves
+
+	def display(self, surface, alpha=1.0, camera=None):
+		'draws the well where camera sees it, without one it is on the background'
+		if camera is None:
+			return []
+		x, y = camera.toView(self.x, self.y)
+		size = self.rad + 6
+		if not camera.visible(x, y, size):
+			return []
+		image = GravityWell.images.get(self.rad)
+		if image is None:
+			image = pygame.Surface((2 * size, 2 * size), flags=pygame.SRCALPHA, depth=32)
+			image.fill((0,0,0,0))
+			self.drawAt(image, (size, size))
+			image = GravityWell.images[self.rad] = image.convert_alpha()
+		return [surface.blit(image, (int(x) - size, int(y) - size))]
@@ -0,0 +1,9 @@
+def options(args):
+	'''Returns option(name, default, convert=int) for the command line args,
+	which gives what follows name in args (through convert), or default
+	when name is not there'''
+	def option(name, default, convert=int):
+		if name in args:
+			return convert(args[args.index(name) + 1])
+		return default
+	return option
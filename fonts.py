@@ -0,0 +1,31 @@
+import pygame, collections
+
+# every font we loaded, SysFont has to search the system fonts each time
+fonts = {}
+
+# most recently rendered texts, oldest first
+texts = collections.OrderedDict()
+maxTexts = 256
+
+def get(size, bold=False, name='monospace'):
+	'Returns the (shared) font for name, size and boldness'
+	key = (name, size, bold)
+	font = fonts.get(key)
+	if font is None:
+		font = pygame.font.SysFont(name, size)
+		font.set_bold(bold)
+		fonts[key] = font
+	return font
+
+def render(text, color, size, bold=False, name='monospace'):
+	'Returns an (antialiased) image of text, reusing one rendered before'
+	key = (name, size, bold, text, color)
+	image = texts.pop(key, None)
+	if image is None:
+		image = get(size, bold, name).render(text, 1, color)
+
+	# keep as most recently used, forget the oldest
+	texts[key] = image
+	if len(texts) > maxTexts:
+		texts.popitem(last=False)
+	return image
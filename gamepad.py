@@ -0,0 +1,58 @@
+import pygame
+import games as g
+
+class Gamepad:
+	'''Plays a ship with a joystick, a controller for Game.controllers like
+	the bots: stick or hat to turn, thrust and reverse, buttons for the rest'''
+
+	# held down, by button number (as on most pads: A, B, X, Y, ..., back, start)
+	buttons = {0: g.SHOOT, 1: g.SHIELD, 2: g.JUMP, 3: g.THRUST, 6: g.ENERGY_DOWN, 7: g.ENERGY_UP}
+
+	# the shoulder buttons pick a system, once for each press
+	pressButtons = {4: g.PREV_SYSTEM, 5: g.NEXT_SYSTEM}
+
+	# how far the stick has to be pushed
+	deadZone = 0.5
+
+	def __init__(self, joystick):
+		self.joystick = joystick
+		joystick.init()
+		self.held = set()
+
+	def act(self, game, index):
+		pad = self.joystick
+		x = y = 0.0
+		if pad.get_numaxes() >= 2:
+			x, y = pad.get_axis(0), pad.get_axis(1)
+		if pad.get_numhats() >= 1:
+			hatx, haty = pad.get_hat(0)
+			x, y = x + hatx, y - haty
+
+		action = 0
+		if x > Gamepad.deadZone:
+			action |= g.ROTATE_RIGHT
+		elif x < -Gamepad.deadZone:
+			action |= g.ROTATE_LEFT
+		if y < -Gamepad.deadZone:
+			action |= g.THRUST
+		elif y > Gamepad.deadZone:
+			action |= g.REVERSE
+
+		count = pad.get_numbuttons()
+		for button, bit in Gamepad.buttons.iteritems():
+			if button < count and pad.get_button(button):
+				action |= bit
+		for button, bit in Gamepad.pressButtons.iteritems():
+			down = button < count and pad.get_button(button)
+			if down and button not in self.held:
+				action |= bit
+			if down:
+				self.held.add(button)
+			else:
+				self.held.discard(button)
+		return action
+
+def connected():
+	'A Gamepad for every joystick plugged in'
+	pygame.joystick.init()
+	return [Gamepad(pygame.joystick.Joystick(i)) for i in range(pygame.joystick.get_count())]
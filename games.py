@@ -1,62 +1,223 @@
-import pygame, math, random
+import pygame, math, random, collections, timeit
 import classes as c
 import menus as m
 import spacewar as sw
+import spatial
+import bullets
+import gravity
+import sprites
+import render
+import fonts
+import snapshot
+import camera
+import profiler
+
+# per player action bits, a tick of input is one bitmask per player
+ROTATE_RIGHT = 1 << 0
+ROTATE_LEFT  = 1 << 1
+THRUST       = 1 << 2
+REVERSE      = 1 << 3
+SHOOT        = 1 << 4
+JUMP         = 1 << 5
+SHIELD       = 1 << 6
+ENERGY_DOWN  = 1 << 7
+ENERGY_UP    = 1 << 8
+NEXT_SYSTEM  = 1 << 9
+PREV_SYSTEM  = 1 << 10
+
+
+class Arena:
+	'Stand in for spacewar.State when running a game without a display'
+
+	def __init__(self, width=1024, height=768, gravityGrid=0):
+		self.width = width
+		self.height = height
+		self.size = (width, height)
+		self.gravityGrid = gravityGrid
+		self.worldSize = None # the same as size
+		self.starSeed = 0
+		self.tickRate = 60
+
 
 class Game:
+	name = 'classic'
+
 	color1 = (255,100,100, 250) # TODO would be nice to have player colors in settings
 	color2 = (100,100,255, 250)
 
-	def __init__(self, state):
+	# a color for each ship, bullets know their owner by it
+	colors = [color1, color2,
+		(100,255,100, 250), (255,255,100, 250), (255,100,255, 250), (100,255,255, 250),
+		(255,170,60, 250), (170,100,255, 250), (210,210,210, 250), (255,150,190, 250),
+		(150,255,190, 250), (120,180,255, 250), (200,255,100, 250), (255,210,160, 250),
+		(190,150,110, 250), (150,150,150, 250)]
+	maxPlayers = len(colors)
+
+	# how far things can move during one tick of collision checks
+	margin = 10
+
+	# backgrounds we already made, see createBackGround
+	backgrounds = collections.OrderedDict()
+	maxBackgrounds = 8
+
+	# most ticks run in one frame to catch up, past that the game slows down
+	maxTicks = 10
+
+	# most seconds CPU players (see ai) spend thinking in one frame, they
+	# only get what is left of the frame after drawing it
+	thinkTime = 0.008
+
+	# keys held down for each player, mapped to action bits
+	keys = [
+		{pygame.K_d: ROTATE_RIGHT, pygame.K_a: ROTATE_LEFT,
+		 pygame.K_w: THRUST, pygame.K_s: REVERSE,
+		 pygame.K_LSHIFT: SHOOT, pygame.K_z: JUMP, pygame.K_LCTRL: SHIELD,
+		 pygame.K_q: ENERGY_DOWN, pygame.K_e: ENERGY_UP},
+		{pygame.K_RIGHT: ROTATE_RIGHT, pygame.K_LEFT: ROTATE_LEFT,
+		 pygame.K_UP: THRUST, pygame.K_DOWN: REVERSE,
+		 pygame.K_RSHIFT: SHOOT, pygame.K_SLASH: JUMP, pygame.K_PERIOD: SHIELD,
+		 pygame.K_LEFTBRACKET: ENERGY_DOWN, pygame.K_RIGHTBRACKET: ENERGY_UP}]
+
+	# system selection happens on key press rather than while held
+	pressKeys = [
+		{pygame.K_TAB: NEXT_SYSTEM, pygame.K_BACKQUOTE: PREV_SYSTEM},
+		{pygame.K_BACKSLASH: NEXT_SYSTEM, pygame.K_BACKSPACE: PREV_SYSTEM}]
+
+	def __init__(self, state, headless=False, seed=None, players=2):
 		self.state = state
-		SIZE = WIDTH, HEIGHT = state.size
+		self.headless = headless
 
-		self.buff = pygame.Surface(SIZE, flags=pygame.SRCALPHA, depth=32)
-		self.buff = self.buff.convert_alpha()
+		# where things are and wrap around, the screen unless the state
+		# asks for a world of another size, which the camera shows part of
+		self.world = state
+		if state.worldSize is not None and tuple(state.worldSize) != state.size:
+			self.world = Arena(state.worldSize[0], state.worldSize[1], state.gravityGrid)
+		WIDTH, HEIGHT = self.world.size
+
+		# everything random in a game comes from its seed, so the
+		# same seed and input always play out the same (see replay)
+		if seed is None:
+			seed = random.randrange(1 << 32)
+		self.seed = seed
+		self.random = random.Random(seed)
+		self.recorder = None
 
-		self.font = pygame.font.SysFont('monospace', m.Menu.fontsize)
-		self.font.set_bold(True)
-		self.textcolor = (255,255,255)
 		self.winner = False
-		self.initThings()
-		self.createBackGround(WIDTH, HEIGHT)
+		self.paused = False
+		self.frame = None
+		self.textcolor = (255,255,255)
+		if not 2 <= players <= Game.maxPlayers:
+			raise ValueError('a game has 2 to %d players, not %d' % (Game.maxPlayers, players))
+		self.players = []
+		self.initThings(players)
 
-	def initThings(self):
-		WIDTH, HEIGHT = self.state.size
-		self.player1 = c.Player(Game.color1, WIDTH/2 - WIDTH/4, HEIGHT/2, 180, 'left')
-		self.player2 = c.Player(Game.color2, WIDTH/2 + WIDTH/4, HEIGHT/2, 0, 'right')
+		# who plays each seat, None for the keyboard or anything with
+		# act(game, index) like the bots, and what everyone did last tick
+		self.controllers = [None] * len(self.players)
+		self.lastActions = [0] * len(self.players)
+		self.deadline = None
+		self.wells = [t for t in self.things if isinstance(t, c.GravityWell)]
+		self.bullets = bullets.BulletField(self.world)
+		self.grid = spatial.SpatialHash(WIDTH, HEIGHT)
+		self.createField(WIDTH, HEIGHT)
+
+		# step times its phases only for the game on screen
+		self.profile = profiler.off if headless else state.profiler
+
+		# a headless game only simulates, it never touches the display
+		if headless:
+			return
+
+		self.camera = None
+		if self.world is state:
+			self.buff = pygame.Surface(state.size, flags=pygame.SRCALPHA, depth=32)
+			self.buff = self.buff.convert_alpha()
+			self.createBackGround(WIDTH, HEIGHT)
+			self.renderer = render.DirtyRenderer(self.bg, self.buff, state.dirtyRects)
+		else:
+			# a world that would fit the window is only drawn at a lower
+			# resolution, the camera shows all of it scaled down
+			windowWidth, windowHeight = state.windowSize()
+			whole = WIDTH <= windowWidth and HEIGHT <= windowHeight
+			self.camera = camera.Camera(self.world, state.width, state.height,
+				state.starSeed, state.starDensity, whole)
+			self.camera.follow(self.players, 1.0)
+		self.layoutHuds(state.width, state.height)
+
+		# the simulation runs at a fixed tick rate, whatever the frame rate
+		self.tickTime = 1.0 / state.tickRate
+		self.lastTime = None
+		self.lag = 0.0
+		self.drawTime = 0.0 # how long display takes, on average
+		self.alpha = 1.0
+		self.pressed = [0] * len(self.players)
+
+		# render ships at every angle now rather than mid game
+		for player in self.players:
+			sprites.ships.prepare(player.color)
+			sprites.ships.get(player.uicolor, 270)
+
+	def initThings(self, players):
+		'''Ships around the black hole, facing away from it, two of them
+		to its left and right'''
+		WIDTH, HEIGHT = self.world.size
+		for i in range(players):
+			deg = (180 + 360 * i / players) % 360
+			x = WIDTH/2 + int(round(WIDTH/4 * math.cos(math.radians(deg))))
+			y = HEIGHT/2 + int(round(HEIGHT/4 * math.sin(math.radians(deg))))
+			self.players.append(c.Player(self.world, Game.colors[i], x, y, deg, 'left'))
 		self.blackhole = c.GravityWell(WIDTH/2, HEIGHT/2, 15, 5.5)
-		self.things = [self.player1, self.player2, self.blackhole]
+		self.things = self.players + [self.blackhole]
+
+	def layoutHuds(self, width, height):
+		'''Spreads the HUDs over the top of the screen, over the bottom too
+		when they don't fit, at half size when two rows don't fit either.
+		The ones on the right are mirrored'''
+		count = len(self.players)
+		w, h = c.Player.hudSize
+		rows = 1 if count * w <= width else 2
+		perRow = (count + rows - 1) / rows
+		scale = 1.0 if perRow * w <= width else 0.5
+		w, h = int(w * scale), int(h * scale)
+		for i, player in enumerate(self.players):
+			row, col = divmod(i, perRow)
+			x = col * (width - w) / max(perRow - 1, 1)
+			y = 0 if row == 0 else height - h
+			player.placeHud(x, y, 'right' if x + w / 2 > width / 2 else 'left', scale)
 
 	def createBackGround(self, width, height):
-		self.bg = pygame.Surface((width, height), flags=pygame.SRCALPHA, depth=32)
-		self.bg.fill((0,0,0))
-
-		# draw stars
-		pxarray = pygame.PixelArray(self.bg)
-		for i in range(3000):
-			x = random.randrange(width)	
-			y = random.randrange(height)
-			c = random.randrange(256)
-			pxarray[x][y] = (c, c, c)
-		del pxarray
-
-		# draw elements that don't change
-		for thing in self.things:
-			thing.drawBg(self.bg)
+		'''Makes (or reuses) the stars and wells background, restarting
+		a game finds the one made before'''
+		seed = self.state.starSeed
+		density = self.state.starDensity
+		wells = tuple((well.x, well.y, well.rad) for well in self.wells)
+		key = (width, height, seed, density, wells)
 
-		self.bg = self.bg.convert()
+		self.bg = Game.backgrounds.pop(key, None)
+		if self.bg is None:
+			self.bg = render.starfield(width, height, seed, density)
 
-	def resize(self, width, height): 
-		for thing in self.things:
-			thing.resize(width, height)
-		
-		self.buff = pygame.Surface((width, height), flags=pygame.SRCALPHA, depth=32)
-		self.buff = self.buff.convert_alpha()
-		self.createBackGround(width, height)
-		
-	def loop(self, screen):
-		'Main game loop checks input, does state updates, draws game to screen'
+			# draw elements that don't change
+			for well in self.wells:
+				well.drawBg(self.bg)
+
+			self.bg = self.bg.convert()
+
+		# most recently used last, forget the oldest
+		Game.backgrounds[key] = self.bg
+		if len(Game.backgrounds) > Game.maxBackgrounds:
+			Game.backgrounds.popitem(last=False)
+
+	def createField(self, width, height):
+		'''Samples the pull of the wells on a grid when the state asks for
+		it (gravityGrid is the grid spacing), otherwise wells pull directly'''
+		self.field = None
+		if self.state.gravityGrid > 0:
+			self.field = gravity.GravityField(self.wells, width, height, self.state.gravityGrid)
+
+	def readInput(self):
+		'Turns pygame events and key state into one action bitmask per player'
+		actions = [0] * len(self.players)
 
 		# quit on window close 
 		for event in pygame.event.get():
@@ -64,150 +225,279 @@ class Game:
 				sw.quit()
 
 			elif event.type == pygame.KEYDOWN:
-				# player 1 system selection
-				if event.key == pygame.K_TAB:
-					self.player1.nextsystem(1)
-				elif event.key == pygame.K_BACKQUOTE:
-					self.player1.nextsystem(-1)
-				# player 2 system selection
-				elif event.key == pygame.K_BACKSLASH:
-					self.player2.nextsystem(1)
-				elif event.key == pygame.K_BACKSPACE:
-					self.player2.nextsystem(-1)
-					
-
-		# general input
+				for i in range(min(len(actions), len(Game.pressKeys))):
+					actions[i] |= Game.pressKeys[i].get(event.key, 0)
+
 		keys = pygame.key.get_pressed()
 		if keys[pygame.K_ESCAPE]:
-			self.state.current = self.state.mainMenu
+			self.paused = True
 
-		# while we haven't lost / won
-		if self.winner == False:
-			# player 1 input - movement
-			if keys[pygame.K_d]:
-				self.player1.rotate(+5)
-			if keys[pygame.K_a]:
-				self.player1.rotate(-5)
-			if keys[pygame.K_w]:
-				self.player1.accellerate(+0.25)
-			if keys[pygame.K_s]:
-				self.player1.accellerate(-0.1)
+		# the keyboard plays the first two ships, see controllers for the rest
+		for i in range(min(len(actions), len(Game.keys))):
+			for key, action in Game.keys[i].iteritems():
+				if keys[key]:
+					actions[i] |= action
 
-			# actions: shoot, jump, shield
-			if keys[pygame.K_LSHIFT]:
-				b = self.player1.shoot()
-				if b != False:
-					self.things.append(b)
-			if keys[pygame.K_z]:
-				self.player1.hyperjump()
-			if keys[pygame.K_LCTRL]:
-				self.player1.shield()
-			
-			# energy management:
-			if keys[pygame.K_q]:
-				self.player1.energy(-1)
-			if keys[pygame.K_e]:
-				self.player1.energy(+1)
-
-
-			# player 2 input - movement
-			if keys[pygame.K_RIGHT]:
-				self.player2.rotate(+5)
-			if keys[pygame.K_LEFT]:
-				self.player2.rotate(-5)
-			if keys[pygame.K_UP]:
-				self.player2.accellerate(+0.25)
-			if keys[pygame.K_DOWN]:
-				self.player2.accellerate(-0.1)
+		return actions
+
+	def step(self, actions):
+		'''Advances the simulation by one tick given one action bitmask
+		per player, never touches the display, returns the winner'''
+
+		# nothing moves anymore once we have a winner
+		if self.winner != False:
+			return self.winner
+
+		if self.recorder is not None:
+			self.recorder.record(actions)
+		self.lastActions = actions
+
+		# where things were, for drawing in between ticks
+		for thing in self.things:
+			thing.remember()
+		self.bullets.remember()
+		profile = self.profile
+
+		for player, action in zip(self.players, actions):
+			# system selection
+			if action & NEXT_SYSTEM:
+				player.nextsystem(1)
+			if action & PREV_SYSTEM:
+				player.nextsystem(-1)
+
+			# movement
+			if action & ROTATE_RIGHT:
+				player.rotate(+5)
+			if action & ROTATE_LEFT:
+				player.rotate(-5)
+			if action & THRUST:
+				player.accellerate(+0.25)
+			if action & REVERSE:
+				player.accellerate(-0.1)
 
 			# actions: shoot, jump, shield
-			if keys[pygame.K_RSHIFT]:
-				b = self.player2.shoot()
-				if b != False:
-					self.things.append(b)
-			if keys[pygame.K_SLASH]:
-				self.player2.hyperjump()
-			if keys[pygame.K_PERIOD]:
-				self.player2.shield()
+			if action & SHOOT:
+				player.shoot(self.bullets)
+			if action & JUMP:
+				player.hyperjump(self.random)
+			if action & SHIELD:
+				player.shield()
 
 			# energy management:
-			if keys[pygame.K_LEFTBRACKET]:
-				self.player2.energy(-1)
-			if keys[pygame.K_RIGHTBRACKET]:
-				self.player2.energy(+1)
+			if action & ENERGY_DOWN:
+				player.energy(-1)
+			if action & ENERGY_UP:
+				player.energy(+1)
+		profile.mark('actions')
 
-			# do updates and check collisions
-			for thing in self.things:
-				for thing2 in self.things:
-					if isinstance(thing2, c.Bullet):
-						break
-					thing.checkCollision(thing2)
-				thing.update(self.things)
-				#thing.checkCollision(self.player2)
-				#thing.checkCollision(self.blackhole)
-			
-			# check win condition
-			if self.player1.lives < 0 and self.player2.lives < 0:
-				self.winner = "It's a Tie!"
-			elif self.player1.lives < 0:
-				self.winner = 'Player 2 has won!'
-				self.textcolor = self.player2.color
-			elif self.player2.lives < 0:
-				self.winner = 'Player 1 has won!'
-				self.textcolor = self.player1.color
+		# broad phase: everything goes in the grid, the margin
+		# covers how far things move while we go through them
+		self.grid.clear()
+		for thing in self.things:
+			self.grid.insert(thing, thing.reach + Game.margin)
 
-			# remove resume if game is over
-			if self.player1.lives < 0 or self.player2.lives < 0:
-				self.state.mainMenu.items.pop(0)
+		# do updates and check collisions against nearby things only,
+		# a thing at a time (the marks add up over the loop)
+		for thing in self.things:
+			for thing2 in self.grid.nearby(thing, thing.reach):
+				thing.checkCollision(thing2)
+			profile.mark('collide')
+
+			# with a gravity field the wells don't do the pulling, without
+			# one they only pull the ships (wells never move)
+			if self.field is None or not isinstance(thing, c.GravityWell):
+				thing.update(self.players)
+			profile.mark('update')
+
+		if self.field is not None:
+			self.field.pull(self.players)
+			profile.mark('update')
+
+		# bullets are done all at once: pulled by the wells,
+		# hitting ships and wells, then moving on
+		WIDTH, HEIGHT = self.world.size
+		if self.field is None:
+			self.bullets.applyGravity(self.wells)
+		else:
+			self.bullets.applyField(self.field)
+		self.bullets.collide(self.things)
+		self.bullets.update(WIDTH, HEIGHT)
+		profile.mark('bullets')
+
+		# check win condition, the last one left wins
+		left = [i for i, player in enumerate(self.players) if player.lives >= 0]
+		if not left:
+			self.winner = "It's a Tie!"
+		elif len(left) == 1:
+			self.winner = 'Player %d has won!' % (left[0] + 1)
+			self.textcolor = self.players[left[0]].color
 
-		# initialize screen
-		screen.blit(self.bg, (0,0))
+		return self.winner
 
-		# clear buffer
-		self.buff.fill((0,0,0,0))
+	def control(self, actions):
+		'The actions with those of the seats a controller plays filled in'
+		actions = list(actions)
+		for i, controller in enumerate(self.controllers):
+			if controller is not None:
+				actions[i] = controller.act(self, i)
+		return actions
+
+	def getState(self):
+		'''Copy of everything that changes during a game, so it can be
+		picked up again from this point with setState (see snapshot)'''
+		return snapshot.save(self)
+
+	def setState(self, state):
+		snapshot.restore(self, state)
+
+	def pause(self, screen):
+		'''Stops the game and goes to the main menu, which shows the last
+		frame (faded) behind it'''
+		self.frame = screen.copy()
+		shade = pygame.Surface(screen.get_size(), flags=pygame.SRCALPHA, depth=32)
+		shade.fill(m.Menu.background + (176,))
+		self.frame.blit(shade, (0,0))
+		self.frame = self.frame.convert()
+		self.state.current = self.state.mainMenu
+
+	def invalidate(self):
+		'''Redraw the whole screen next frame, something else drew on it,
+		and don't count the time we were not shown'''
+		if self.camera is None:
+			self.renderer.invalidate()
+		self.lastTime = None
+
+	def display(self, screen):
+		'''Draws the current state of the game to the screen, returns the
+		rects that changed, or None if the whole screen was redrawn'''
+		if self.camera is None:
+			return self.renderer.draw(screen, self.drawThings)
+
+		# the camera redraws the whole screen anyway, HUDs go on top
+		self.camera.follow([player for player in self.players if player.lives >= 0])
+		self.camera.draw(screen, self.drawThings)
+		for player in self.players:
+			player.displayHud(screen)
+		self.drawWinner(screen)
+		return None
+
+	def drawThings(self, surface, camera=None):
+		'''Draws everything that is not on the background, seen through
+		camera if there is one, returns the rects drawn to'''
+		drawn = []
 
 		# draw the things
 		for thing in self.things:
-			thing.display(self.buff)
+			drawn.extend(thing.display(surface, self.alpha, camera))
+		drawn.extend(self.bullets.display(surface, self.alpha, camera))
 
-		# display who has won
-		if self.winner != False:
-			text = self.font.render(self.winner, 1, self.textcolor)
-			rect = text.get_rect()
-			WIDTH, HEIGHT = self.state.size
-			self.buff.blit(text, (WIDTH/2 - rect.w / 2, HEIGHT/4))
+		if camera is None:
+			drawn.extend(self.drawWinner(surface))
 
-		# draw buffer onto the screen (alpha blending)
-		screen.blit(self.buff, (0,0))
+		self.state.profiler.mark('draw')
+		return drawn
 
-class RandomGame(Game):
-	def initThings(self):
+	def drawWinner(self, surface):
+		'Displays who has won (if anyone has yet), returns the rects drawn to'
+		if self.winner == False:
+			return []
+		text = fonts.render(self.winner, self.textcolor, m.Menu.fontsize, True)
+		rect = text.get_rect()
 		WIDTH, HEIGHT = self.state.size
+		return [surface.blit(text, (WIDTH/2 - rect.w / 2, HEIGHT/4))]
+
+	def loop(self, screen):
+		'Main game loop checks input, does state updates, draws game to screen'
+		profile = self.state.profiler
+		actions = self.readInput()
+		profile.mark('input')
+
+		# escape was pressed, the screen still has the last frame
+		if self.paused:
+			self.pause(screen)
+			return []
+
+		# key presses are kept until a tick uses them
+		for i in range(len(actions)):
+			self.pressed[i] |= actions[i] & (NEXT_SYSTEM | PREV_SYSTEM)
+			actions[i] = (actions[i] & ~(NEXT_SYSTEM | PREV_SYSTEM)) | self.pressed[i]
+
+		# run as many ticks as fit in the time since the last frame
+		now = timeit.default_timer()
+		if self.lastTime is None:
+			self.lastTime = now - self.tickTime
+		self.lag = min(self.lag + now - self.lastTime, Game.maxTicks * self.tickTime)
+		self.lastTime = now
+		frame = 1.0 / (self.state.fps or self.state.tickRate)
+		self.deadline = now + max(0.0, min(Game.thinkTime, frame - self.drawTime))
+
+		# while we haven't lost / won
+		while self.lag >= self.tickTime and self.winner == False:
+			actions = self.control(actions)
+			profile.mark('cpu')
+			self.step(actions)
+			profile.mark('step')
+			self.lag -= self.tickTime
+
+			# presses only count once
+			self.pressed = [0] * len(self.players)
+			actions = [action & ~(NEXT_SYSTEM | PREV_SYSTEM) for action in actions]
+
+			# remove resume if game is over
+			if self.winner != False:
+				self.state.mainMenu.items.pop(0)
+				if self.recorder is not None:
+					self.recorder.save()
+
+		# draw things this far between the last tick and the next
+		self.alpha = min(self.lag / self.tickTime, 1.0)
+		profile.mark('other')
+		start = timeit.default_timer()
+		drawn = self.display(screen)
+		self.drawTime = self.drawTime * 0.9 + (timeit.default_timer() - start) * 0.1
+		profile.mark('blit')
+		profile.count('bullets', self.bullets.count)
+		profile.count('things', len(self.things))
+		# -1 for a full redraw
+		profile.count('rects', -1 if drawn is None else len(drawn))
+		return drawn
+
+class RandomGame(Game):
+	name = 'random'
+
+	# most wells in a screen's worth of world
+	maxWells = 4
+
+	@staticmethod
+	def screens(width, height):
+		'How many screens worth of wells a world this big gets'
+		return max(1, width * height // (1024 * 768))
+
+	def initThings(self, players):
+		WIDTH, HEIGHT = self.world.size
 		self.things = []
-		holes = random.randrange(1, 4)
-		for i in range(holes + 1):
+		holes = self.random.randrange(1, RandomGame.maxWells)
+
+		# as many wells for every screen's worth of a bigger world
+		for i in range((holes + 1) * RandomGame.screens(WIDTH, HEIGHT)):
 			(x,y) = self.getLocation()
-			rad = random.randrange(0, 30)
-			pow = random.uniform(2.5, 7.5)
+			rad = self.random.randrange(0, 30)
+			pow = self.random.uniform(2.5, 7.5)
 			self.things.append(c.GravityWell(x, y, rad, pow))
 
-		(x,y) = self.getLocation()
-		rot = random.randrange(0, 360)
-		self.player1 = c.Player(Game.color1, x, y, rot, 'left')
-		self.things.append(self.player1)
-
-		(x,y) = self.getLocation()
-		rot = random.randrange(0, 360)
-		self.player2 = c.Player(Game.color2, x, y, rot, 'right')
-		self.things.append(self.player2)
+		for i in range(players):
+			(x,y) = self.getLocation()
+			rot = self.random.randrange(0, 360)
+			self.players.append(c.Player(self.world, Game.colors[i], x, y, rot, 'left'))
+			self.things.append(self.players[-1])
 
 	def getLocation(self):
-		WIDTH, HEIGHT = self.state.size
+		WIDTH, HEIGHT = self.world.size
 		close = True
 		while close:
 			close = False
-			x = random.randrange(0, WIDTH)
-			y = random.randrange(0, HEIGHT)
+			x = self.random.randrange(0, WIDTH)
+			y = self.random.randrange(0, HEIGHT)
 			for thing in self.things:
 				dx = thing.x - x
 				dy = thing.y - y
@@ -216,3 +506,6 @@ class RandomGame(Game):
 					close = True
 		return (x,y)
 		
+
+# game classes by name (as stored in replays)
+types = dict((cls.name, cls) for cls in (Game, RandomGame))
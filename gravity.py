@@ -0,0 +1,136 @@
+import math, random, sys
+import numpy as np
+
+def exact(wells, x, y, ax=None, ay=None):
+	'''Summed pull of all wells at x, y (scalars or arrays), the same
+	forces GravityWell.update applies one object at a time. Given ax and
+	ay (arrays) the pull is added to them in place, a well at a time.'''
+	x = np.asarray(x, dtype=float)
+	y = np.asarray(y, dtype=float)
+	if ax is None:
+		ax = np.zeros(np.broadcast(x, y).shape)
+		ay = np.zeros(ax.shape)
+	for well in wells:
+		dx = well.x - x
+		dy = well.y - y
+		dist = dx * dx + dy * dy
+
+		# force / (dist/2) along the unit vector dx/dist, dy/dist,
+		# right on top of it there is no direction so push along x
+		with np.errstate(divide='ignore', invalid='ignore'):
+			scale = np.where(dist != 0, 2 * well.force / dist, 0.0)
+		ax += np.where(dist != 0, dx * scale, well.force)
+		ay += dy * scale
+	return ax, ay
+
+
+class GravityField:
+	'''Pull of static gravity wells sampled on a grid over the screen,
+	objects look up their pull with bilinear interpolation so gravity
+	costs the same no matter how many wells there are.
+
+	Close to a well the pull changes too fast to interpolate, cells
+	there are marked and fall back to the exact sum over all wells.'''
+
+	def __init__(self, wells, width, height, spacing=8):
+		self.wells = list(wells)
+		self.spacing = float(spacing)
+		self.cols = int(math.ceil(width / self.spacing)) + 1
+		self.rows = int(math.ceil(height / self.spacing)) + 1
+
+		# pull at every grid point, indexed [column][row]
+		xs = np.arange(self.cols) * self.spacing
+		ys = np.arange(self.rows) * self.spacing
+		gx, gy = np.meshgrid(xs, ys, indexing='ij')
+		self.ax, self.ay = exact(self.wells, gx, gy)
+
+		# cells (named by their top left grid point) near a well
+		near = np.zeros((self.cols, self.rows), dtype=bool)
+		for well in self.wells:
+			reach = max(well.rad, 0) + 2 * self.spacing
+			near |= (gx - well.x) ** 2 + (gy - well.y) ** 2 <= reach * reach
+		# a cell is near if any of its corners is
+		near[:-1, :] |= near[1:, :]
+		near[:, :-1] |= near[:, 1:]
+		self.near = near
+
+		# plain lists are faster than numpy for one object at a time
+		self.axlist = self.ax.tolist()
+		self.aylist = self.ay.tolist()
+		self.nearlist = near.tolist()
+
+	def at(self, x, y):
+		'Returns the pull at one location'
+		fx = x / self.spacing
+		fy = y / self.spacing
+		col = min(max(int(fx), 0), self.cols - 2)
+		row = min(max(int(fy), 0), self.rows - 2)
+		if self.nearlist[col][row]:
+			ax, ay = exact(self.wells, x, y)
+			return float(ax), float(ay)
+
+		tx = fx - col
+		ty = fy - row
+		axs = self.axlist
+		ays = self.aylist
+		a0 = axs[col][row] * (1 - ty) + axs[col][row + 1] * ty
+		a1 = axs[col + 1][row] * (1 - ty) + axs[col + 1][row + 1] * ty
+		b0 = ays[col][row] * (1 - ty) + ays[col][row + 1] * ty
+		b1 = ays[col + 1][row] * (1 - ty) + ays[col + 1][row + 1] * ty
+		return a0 * (1 - tx) + a1 * tx, b0 * (1 - tx) + b1 * tx
+
+	def sample(self, x, y):
+		'Returns the pull at arrays of locations'
+		fx = x / self.spacing
+		fy = y / self.spacing
+		col = np.clip(fx.astype(np.int32), 0, self.cols - 2)
+		row = np.clip(fy.astype(np.int32), 0, self.rows - 2)
+		tx = fx - col
+		ty = fy - row
+
+		ax = (self.ax[col, row] * (1 - tx) * (1 - ty) +
+			self.ax[col + 1, row] * tx * (1 - ty) +
+			self.ax[col, row + 1] * (1 - tx) * ty +
+			self.ax[col + 1, row + 1] * tx * ty)
+		ay = (self.ay[col, row] * (1 - tx) * (1 - ty) +
+			self.ay[col + 1, row] * tx * (1 - ty) +
+			self.ay[col, row + 1] * (1 - tx) * ty +
+			self.ay[col + 1, row + 1] * tx * ty)
+
+		near = self.near[col, row]
+		if near.any():
+			ax[near], ay[near] = exact(self.wells, x[near], y[near])
+		return ax, ay
+
+	def pull(self, things):
+		'Applies the pull to each thing, like GravityWell.update does'
+		for thing in things:
+			ax, ay = self.at(thing.x, thing.y)
+			thing.push(ax, ay)
+
+	def accuracy(self, width, height, samples=10000, rng=random):
+		'''Compares the field against the exact sum at random locations,
+		returns the largest and mean error relative to the exact pull'''
+		x = np.array([rng.uniform(0, width) for i in range(samples)])
+		y = np.array([rng.uniform(0, height) for i in range(samples)])
+		ex, ey = exact(self.wells, x, y)
+		fx, fy = self.sample(x, y)
+		err = np.hypot(fx - ex, fy - ey) / np.maximum(np.hypot(ex, ey), 1e-12)
+		return float(err.max()), float(err.mean())
+
+
+if __name__ == '__main__':
+	# accuracy check for a random layout like RandomGame makes:
+	# python gravity.py [wells] [seed]
+	import classes as c
+
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+	rng = random.Random(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+	width, height = 1280, 800
+	wells = [c.GravityWell(rng.randrange(width), rng.randrange(height),
+		rng.randrange(0, 30), rng.uniform(2.5, 7.5)) for i in range(count)]
+
+	for spacing in (4, 8, 16, 32):
+		field = GravityField(wells, width, height, spacing)
+		worst, mean = field.accuracy(width, height, rng=rng)
+		print('spacing {:3}: max error {:8.4%}  mean error {:8.4%}'.format(spacing, worst, mean))
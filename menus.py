@@ -1,5 +1,16 @@
 import pygame
 import spacewar as sw
+import fonts
+
+# posted to wake up a waiting menu, see waitEvent
+IDLE = pygame.USEREVENT
+
+def waitEvent(timeout):
+	'Waits (without using the cpu) for an event or until timeout ms passed'
+	pygame.time.set_timer(IDLE, timeout)
+	event = pygame.event.wait()
+	pygame.time.set_timer(IDLE, 0)
+	return event
 
 class MenuItem:
 	def __init__(self, text, action):
@@ -13,7 +24,7 @@ class MenuItem:
 		pass
 
 	def display(self, surface, pos, color):
-		img = Menu.font.render(self.text, 1, color)
+		img = fonts.render(self.text, color, Menu.fontsize, True)
 		surface.blit(img, pos)
 
 
@@ -31,7 +42,7 @@ class MenuValues:
 
 	def display(self, surface, pos, color):
 		disp = '{:20} {:>6}'.format(self.text, self.values[self.curval])
-		img = Menu.font.render(disp, 1, color)
+		img = fonts.render(disp, color, Menu.fontsize, True)
 		surface.blit(img, pos)
 		
 
@@ -40,7 +51,7 @@ class MenuCancel(MenuItem):
 		MenuItem.__init__(self, text, values)
 		
 	def display(self, surface, (x, y), color):
-		img = Menu.font.render(self.text, 1, color)
+		img = fonts.render(self.text, color, Menu.fontsize, True)
 		surface.blit(img, (x + 300, y - 2 * Menu.fontsize))
 		
 
@@ -48,20 +59,37 @@ class Menu:
 	fontsize = 25
 	textcolor = (255,255,255)
 	highlight = (255,255,0)
+	background = (114,159,207)
+
+	# longest we sleep waiting for input (ms)
+	idleTimeout = 1000
 
 	def __init__(self, state, items):
-		Menu.font = pygame.font.SysFont('monospace', Menu.fontsize)
-		self.font.set_bold(True)
 		self.state = state
 		self.items = items
 		self.selected = 0
+		self.dirty = True
+
+	def invalidate(self):
+		'Redraw next loop, something else drew on the screen'
+		self.dirty = True
 	
 	def loop(self, screen):
+		'''Waits for input and redraws the menu when it changed, returns
+		None when the screen was redrawn, no rects when nothing changed'''
+		events = []
+		if not self.dirty:
+			events.append(waitEvent(Menu.idleTimeout))
+		events.extend(pygame.event.get())
+
 		# event driven menu navigation
-		for event in pygame.event.get():
+		for event in events:
 			if event.type == pygame.QUIT:
-				a.quit()
+				sw.quit()
+			elif event.type == pygame.VIDEOEXPOSE:
+				self.dirty = True
 			if event.type == pygame.KEYDOWN:
+				self.dirty = True
 				if event.key in (pygame.K_UP, pygame.K_w):
 					self.selected = \
 						(self.selected - 1) % len(self.items)
@@ -75,8 +103,16 @@ class Menu:
 				elif event.key in (pygame.K_SPACE, pygame.K_RETURN):
 					self.items[self.selected].doAction()
 		
-		# initialize screen
-		screen.fill((114,159,207))
+		if not self.dirty:
+			return []
+		self.dirty = False
+
+		# initialize screen, a paused game shows through
+		game = self.state.game
+		if game is not None and game.paused:
+			screen.blit(game.frame, (0,0))
+		else:
+			screen.fill(Menu.background)
 
 		# render menu items	
 		x = self.state.width * 0.25
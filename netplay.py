@@ -0,0 +1,484 @@
+import sys, socket, errno, struct, heapq, random, threading, timeit
+import pygame
+import games as g
+import bots
+import cli
+
+# packets, the first byte says which kind:
+#   join   client to host, asking for a game (and telling where we are)
+#   hello  host to client, everything needed to set up the same game
+#   ready  client to host, the game can start
+#   input  local actions from a tick on, the first remote tick we still
+#          miss and how many ticks we are ahead of the other side
+#   quit   the other side left
+JOIN, HELLO, READY, INPUT, QUIT = range(1, 6)
+hello = struct.Struct('<B8sIHHHHIB')
+kind = struct.Struct('<B')
+inputs = struct.Struct('<BIIbB')
+action = struct.Struct('<H')
+
+# a press (system selection) only happens on the tick it was made
+presses = g.NEXT_SYSTEM | g.PREV_SYSTEM
+
+
+class UdpLink:
+	'''Non blocking UDP socket to the other peer, the host learns where
+	its peer is from the first packet that arrives'''
+
+	def __init__(self, port=0, peer=None):
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.bind(('', port))
+		self.socket.setblocking(0)
+		self.port = self.socket.getsockname()[1]
+		self.peer = peer
+
+	def send(self, data):
+		if self.peer is not None:
+			try:
+				self.socket.sendto(data, self.peer)
+			except socket.error:
+				pass # the peer is not there (yet), it is UDP after all
+
+	def receive(self):
+		'Returns every packet that arrived since the last call'
+		packets = []
+		while True:
+			try:
+				data, address = self.socket.recvfrom(65536)
+			except socket.error as e:
+				if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ECONNREFUSED):
+					break
+				raise
+			if self.peer is None:
+				self.peer = address
+			if address == self.peer:
+				packets.append(data)
+		return packets
+
+	def close(self):
+		self.socket.close()
+
+
+class LossyLink:
+	'''Wraps a link to hold packets back for latency (plus up to jitter,
+	which also reorders them) and to drop some, for testing'''
+
+	def __init__(self, link, latency=0.0, jitter=0.0, loss=0.0, seed=None, clock=timeit.default_timer):
+		self.link = link
+		self.latency = latency
+		self.jitter = jitter
+		self.loss = loss
+		self.random = random.Random(seed)
+		self.clock = clock
+		self.port = link.port
+		self.queue = []
+		self.sent = 0
+
+	def send(self, data):
+		if self.random.random() < self.loss:
+			return
+		due = self.clock() + self.latency + self.random.uniform(0, self.jitter)
+		heapq.heappush(self.queue, (due, self.sent, data))
+		self.sent += 1
+
+	def flush(self):
+		now = self.clock()
+		while self.queue and self.queue[0][0] <= now:
+			self.link.send(heapq.heappop(self.queue)[2])
+
+	def receive(self):
+		self.flush()
+		return self.link.receive()
+
+	def close(self):
+		self.link.close()
+
+
+class Session:
+	'''Rollback netplay for one game: both peers run the whole simulation,
+	only inputs are sent. Ticks are run with a guess for the remote input
+	(the last one we know of) and when the real input turns out different
+	the game goes back to the snapshot before it and plays those ticks
+	again. Local input is applied delay ticks late, which gives it time to
+	get to the other side and makes rollbacks rarer and shorter.'''
+
+	# furthest we run ahead of the remote input we know of
+	maxRollback = 10
+	# most local inputs in one packet, the rest waits for the next one
+	maxSend = 64
+
+	def __init__(self, game, local, link, delay=2):
+		self.game = game
+		self.local = local
+		self.remote = 1 - local
+		self.link = link
+		self.delay = delay
+
+		# actions of each player by tick, nobody acts during the delay
+		self.inputs = [dict((tick, 0) for tick in range(delay)) for i in range(2)]
+		self.tick = 0         # next tick to simulate
+		self.next = delay     # next tick to get a local action
+		self.received = delay # first tick we miss the remote action of
+		self.acked = 0        # first tick the peer misses our action of
+
+		self.states = {}      # snapshot before each tick we may roll back
+		self.guesses = {}     # remote actions guessed for ticks already run
+		self.rollbackTo = None
+
+		# time sync, see wait
+		self.remoteTick = 0
+		self.remoteAdvantage = 0
+		self.quit = False
+
+		# for the curious
+		self.rollbacks = 0
+		self.replayed = 0
+		self.stalls = 0
+
+	def send(self):
+		'Sends every local action the peer has not confirmed yet'
+		start = max(self.acked, self.next - Session.maxSend)
+		actions = [self.inputs[self.local][tick] for tick in range(start, self.next)]
+		advantage = max(-128, min(127, self.advantage()))
+		self.link.send(inputs.pack(INPUT, start, self.received, advantage, len(actions)) +
+			''.join(action.pack(a) for a in actions))
+
+	def poll(self):
+		'Reads what the peer sent, finding out if we guessed wrong'
+		for data in self.link.receive():
+			if not data:
+				continue
+			which = ord(data[0])
+			if which == HELLO:
+				# our ready got lost
+				self.link.send(kind.pack(READY))
+			elif which == QUIT:
+				self.quit = True
+			elif which == INPUT and len(data) >= inputs.size:
+				which, start, acked, advantage, count = inputs.unpack_from(data)
+				self.acked = max(self.acked, acked)
+				self.remoteTick = max(self.remoteTick, start + count - self.delay)
+				self.remoteAdvantage = advantage
+
+				remote = self.inputs[self.remote]
+				for i in range(count):
+					tick = start + i
+					if tick in remote:
+						continue
+					remote[tick] = action.unpack_from(data, inputs.size + i * action.size)[0]
+					if tick in self.guesses and self.guesses[tick] != remote[tick]:
+						if self.rollbackTo is None or tick < self.rollbackTo:
+							self.rollbackTo = tick
+				while self.received in remote:
+					self.received += 1
+
+	def guess(self, tick):
+		'The remote action for a tick, the real one if we have it'
+		remote = self.inputs[self.remote]
+		if tick in remote:
+			return remote[tick]
+		return remote[self.received - 1] & ~presses
+
+	def simulate(self, tick):
+		self.states[tick] = self.game.getState()
+		actions = [0, 0]
+		actions[self.local] = self.inputs[self.local][tick]
+		actions[self.remote] = self.guess(tick)
+		if tick >= self.received:
+			self.guesses[tick] = actions[self.remote]
+		else:
+			self.guesses.pop(tick, None)
+		self.game.step(actions)
+
+	def rollback(self):
+		'Plays the ticks since a wrong guess again'
+		if self.rollbackTo is None:
+			return
+		tick = self.rollbackTo
+		self.rollbackTo = None
+		self.game.setState(self.states[tick])
+		self.rollbacks += 1
+		self.replayed += self.tick - tick
+		while tick < self.tick:
+			self.simulate(tick)
+			tick += 1
+
+	def advantage(self):
+		'How many ticks we think we are ahead of the peer'
+		return self.tick - self.remoteTick
+
+	def wait(self):
+		'''The peer that is ahead makes every rollback longer for the other
+		one, so it skips a tick now and then to let the other catch up'''
+		return (self.advantage() - self.remoteAdvantage) / 2.0 >= 1
+
+	def update(self):
+		'Handles what arrived without running a tick'
+		self.poll()
+		self.rollback()
+		self.send()
+
+	def advance(self, local):
+		'''Runs the next tick with local (an action bitmask) as our action
+		delay ticks from now, returns False if we have to wait instead'''
+		self.poll()
+		self.rollback()
+
+		if self.tick >= self.received + Session.maxRollback or self.wait():
+			self.stalls += 1
+			self.send()
+			return False
+
+		self.inputs[self.local][self.next] = local
+		self.next += 1
+		self.simulate(self.tick)
+		self.tick += 1
+
+		# we never go back further than the remote input we have
+		for tick in [tick for tick in self.states if tick < self.received]:
+			del self.states[tick]
+			self.guesses.pop(tick, None)
+		self.send()
+		return True
+
+	def close(self):
+		self.link.send(kind.pack(QUIT))
+		self.link.close()
+
+
+def host(link, game, delay, timeout=None):
+	'Offers a game until a peer takes it, returns False on timeout'
+	state = game.state
+	offer = hello.pack(HELLO, game.name, game.seed, game.world.width, game.world.height,
+		state.gravityGrid, state.tickRate, state.starSeed, delay)
+	start = timeit.default_timer()
+	while timeout is None or timeit.default_timer() - start < timeout:
+		link.send(offer)
+		deadline = timeit.default_timer() + 0.25
+		while timeit.default_timer() < deadline:
+			for data in link.receive():
+				if data and ord(data[0]) in (READY, INPUT):
+					return True
+			pygame.time.wait(5)
+	return False
+
+def join(link, timeout=None):
+	'''Waits for a host to offer a game, returns its settings as
+	(type, seed, width, height, gravityGrid, tickRate, starSeed, delay)'''
+	start = timeit.default_timer()
+	while timeout is None or timeit.default_timer() - start < timeout:
+		link.send(kind.pack(JOIN))
+		deadline = timeit.default_timer() + 0.25
+		while timeit.default_timer() < deadline:
+			for data in link.receive():
+				if data and ord(data[0]) == HELLO and len(data) >= hello.size:
+					offer = hello.unpack_from(data)
+					link.send(kind.pack(READY))
+					return (offer[1].rstrip('\0'),) + offer[2:]
+			pygame.time.wait(5)
+	return None
+
+
+class NetGame:
+	'''Plays a Session on screen like Game.loop does, with either set of
+	keys steering our ship, escape leaves'''
+
+	def __init__(self, session):
+		self.session = session
+		self.game = session.game
+		self.tickTime = 1.0 / self.game.state.tickRate
+		self.lastTime = None
+		self.lag = 0.0
+		self.pressed = 0
+
+	def invalidate(self):
+		self.game.invalidate()
+		self.lastTime = None
+
+	def loop(self, screen):
+		actions = self.game.readInput()
+		if self.game.paused or self.session.quit:
+			return False
+		local = actions[0] | actions[1]
+		self.pressed |= local & presses
+		local = (local & ~presses) | self.pressed
+
+		now = timeit.default_timer()
+		if self.lastTime is None:
+			self.lastTime = now - self.tickTime
+		self.lag = min(self.lag + now - self.lastTime, g.Game.maxTicks * self.tickTime)
+		self.lastTime = now
+
+		ran = False
+		while self.lag >= self.tickTime:
+			if not self.session.advance(local):
+				# waiting on the peer, don't build up ticks to catch up with
+				self.lag = min(self.lag, self.tickTime)
+				break
+			ran = True
+			self.lag -= self.tickTime
+			self.pressed = 0
+			local &= ~presses
+		if not ran:
+			self.session.update()
+
+		self.game.alpha = min(self.lag / self.tickTime, 1.0)
+		return self.game.display(screen)
+
+
+def runPeer(session, stop, ticks=None):
+	'Runs a bot controlled session in real time (see --local)'
+	bot = bots.RandomBot()
+	tickTime = 1.0 / session.game.state.tickRate
+	start = timeit.default_timer()
+	while not stop.is_set() and not session.quit:
+		due = int((timeit.default_timer() - start) / tickTime)
+		while session.tick < due and (ticks is None or session.tick < ticks):
+			if not session.advance(bot.act()):
+				break
+		session.update()
+		pygame.time.wait(2)
+	session.close()
+
+def test(ticks=1800, latency=0.05, jitter=0.02, loss=0.1, delay=2, seed=1):
+	'''Two peers over loopback UDP with lag and loss, played on a made up
+	clock as fast as possible, both have to end up where a game run
+	locally with the same inputs ends up'''
+	now = [0.0]
+	clock = lambda: now[0]
+	links = [UdpLink(), UdpLink()]
+	links[0].peer = ('127.0.0.1', links[1].port)
+	links[1].peer = ('127.0.0.1', links[0].port)
+	sessions = []
+	players = []
+	for i in range(2):
+		link = LossyLink(links[i], latency, jitter, loss, seed + i, clock)
+		game = g.RandomGame(g.Arena(), True, seed)
+		sessions.append(Session(game, i, link, delay))
+		players.append(bots.RandomBot(seed + 10 + i))
+
+	start = timeit.default_timer()
+	while min(min(session.tick, session.received) for session in sessions) < ticks:
+		now[0] += 1.0 / 60
+		for session, bot in zip(sessions, players):
+			if session.tick < ticks:
+				session.advance(bot.act())
+			else:
+				session.update()
+		if now[0] > ticks:
+			# over a second per tick, nothing is getting through
+			raise RuntimeError('peers stopped talking to each other')
+	# a last look at what arrived, to roll back the final ticks if needed
+	for session in sessions:
+		session.update()
+	took = timeit.default_timer() - start
+
+	local = g.RandomGame(g.Arena(), True, seed)
+	for tick in range(ticks):
+		local.step([sessions[0].inputs[0][tick], sessions[1].inputs[1][tick]])
+	expected = local.getState().tostring()
+
+	for i, session in enumerate(sessions):
+		same = session.game.getState().tostring() == expected
+		print('peer %d: %s, %d rollbacks replaying %d ticks, %d stalls' %
+			(i, 'in sync' if same else 'OUT OF SYNC', session.rollbacks,
+			session.replayed, session.stalls))
+	print('%d ticks in %.2fs, winner: %s' % (ticks, took, local.winner))
+	for link in links:
+		link.close()
+
+
+def main(args):
+	'''python netplay.py [--port N] [--peer host:port] [--delay N] [--random]
+	                     [--latency ms] [--jitter ms] [--loss fraction] [--local]
+	hosts a game (without --peer) or joins the one hosted at peer,
+	--local plays against a bot on this machine, --test checks rollbacks'''
+	option = cli.options(args)
+
+	if '--test' in args:
+		test(option('--ticks', 1800), option('--latency', 50.0, float) / 1000,
+			option('--jitter', 20.0, float) / 1000, option('--loss', 0.1, float),
+			option('--delay', 2))
+		return
+
+	import spacewar as sw
+	import menus as m
+	import fonts
+	import render
+	pygame.init()
+	state = sw.State()
+	port = option('--port', 5000)
+	peer = option('--peer', None, str)
+	delay = option('--delay', 2)
+	latency = option('--latency', 0.0, float) / 1000
+	jitter = option('--jitter', 0.0, float) / 1000
+	loss = option('--loss', 0.0, float)
+	cls = g.RandomGame if '--random' in args else g.Game
+
+	def connect(port, peer=None):
+		link = UdpLink(port, peer)
+		if latency or jitter or loss:
+			return LossyLink(link, latency, jitter, loss)
+		return link
+
+	# a bot on this machine hosts, we join it like any other peer would
+	stop = threading.Event()
+	if '--local' in args:
+		botLink = connect(0)
+		width, height = state.worldSize or state.size
+		botGame = cls(g.Arena(width, height, state.gravityGrid), True)
+		botGame.state.tickRate = state.tickRate
+		def hostBot():
+			if host(botLink, botGame, delay, 10):
+				runPeer(Session(botGame, 0, botLink, delay), stop)
+		thread = threading.Thread(target=hostBot)
+		thread.daemon = True
+		thread.start()
+		peer = '127.0.0.1:%d' % botLink.port
+		port = 0
+
+	if peer is None:
+		link = connect(port)
+		window = render.Window(state.size, state.windowSize(), state.fullscreen)
+		state.screen = window.surface
+		game = cls(state)
+		print('waiting for a peer on port %d' % port)
+		host(link, game, delay)
+		local = 0
+	else:
+		address, remotePort = peer.rsplit(':', 1)
+		link = connect(port, (socket.gethostbyname(address), int(remotePort)))
+		print('joining %s' % peer)
+		name, seed, width, height, gravityGrid, tickRate, starSeed, delay = join(link)
+		state.setWorld(width, height)
+		state.gravityGrid = gravityGrid
+		state.tickRate = tickRate
+		state.starSeed = starSeed
+		window = render.Window(state.size, state.windowSize(), state.fullscreen)
+		state.screen = window.surface
+		game = g.types[name](state, False, seed)
+		local = 1
+
+	fonts.get(m.Menu.fontsize, True)
+	fonts.get(12)
+	session = Session(game, local, link, delay)
+	netgame = NetGame(session)
+	netgame.invalidate()
+	clock = pygame.time.Clock()
+
+	while True:
+		rects = netgame.loop(state.screen)
+		if rects is False:
+			break
+		window.show(rects)
+		clock.tick(state.fps)
+
+	if session.quit:
+		print('the other player left')
+	print('%d rollbacks replaying %d ticks, %d stalls' %
+		(session.rollbacks, session.replayed, session.stalls))
+	session.close()
+	stop.set()
+	pygame.quit()
+
+if __name__ == '__main__': main(sys.argv[1:])
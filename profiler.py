@@ -0,0 +1,166 @@
+import os, json, time, timeit, collections
+import numpy as np
+import pygame
+import fonts
+
+class Profiler:
+	'''Times the phases of every frame: mark(name) ends a phase, it gets
+	the time since the last mark, and endFrame files the frame away.
+	Turned off (the default) mark, count and endFrame return right away.
+
+	The last frames are kept for the overlay (display), every frame since
+	it was turned on for saving (save) as CSV and JSON.'''
+
+	# frames the overlay averages over, most frames kept for saving
+	window = 240
+	maxFrames = 60 * 60 * 10
+
+	# seconds between overlay updates, text changing every frame is unreadable
+	refresh = 0.25
+
+	fontsize = 12
+	color = (200,255,200)
+	background = (0,0,0)
+
+	def __init__(self):
+		self.enabled = False
+		self.phases = [] # names in the order they were first marked
+		self.countNames = []
+		self.recent = collections.deque(maxlen=Profiler.window)
+		self.frames = []
+		self.panel = None
+		self.panelTime = 0
+		self.start()
+
+	def start(self):
+		'Starts timing a frame'
+		self.last = timeit.default_timer()
+		self.times = {}
+		self.counts = {}
+
+	def mark(self, name):
+		'Ends the phase called name, which took since the last mark'
+		if not self.enabled:
+			return
+		now = timeit.default_timer()
+		if name not in self.phases:
+			self.phases.append(name)
+		self.times[name] = self.times.get(name, 0.0) + now - self.last
+		self.last = now
+
+	def count(self, name, value):
+		'Records how many of something there were this frame'
+		if not self.enabled:
+			return
+		if name not in self.countNames:
+			self.countNames.append(name)
+		self.counts[name] = value
+
+	def endFrame(self):
+		if not self.enabled:
+			return
+		frame = (self.times, self.counts)
+		self.recent.append(frame)
+		if len(self.frames) < Profiler.maxFrames:
+			self.frames.append(frame)
+		self.start()
+
+	def toggle(self):
+		'''Turns the overlay (and timing) on or off, returns whether the
+		screen needs a full redraw to get rid of the overlay'''
+		self.enabled = not self.enabled
+		self.recent.clear()
+		self.panel = None
+		self.start()
+		return not self.enabled
+
+	def table(self, frames):
+		'''Milliseconds per phase (and the whole frame) as an array with a
+		row per frame, and the counts as another'''
+		times = np.array([[frame[0].get(name, 0.0) for name in self.phases]
+			for frame in frames]).reshape(len(frames), len(self.phases)) * 1000
+		times = np.hstack([times, times.sum(axis=1)[:, np.newaxis]])
+		counts = np.array([[frame[1].get(name, 0) for name in self.countNames]
+			for frame in frames]).reshape(len(frames), len(self.countNames))
+		return times, counts
+
+	def summary(self, frames):
+		'Mean, median, 95th, 99th percentile and worst milliseconds per phase'
+		times, counts = self.table(frames)
+		result = collections.OrderedDict()
+		for i, name in enumerate(self.phases + ['frame']):
+			column = times[:, i]
+			result[name] = collections.OrderedDict([('mean', column.mean()),
+				('p50', np.percentile(column, 50)), ('p95', np.percentile(column, 95)),
+				('p99', np.percentile(column, 99)), ('max', column.max())])
+		return result
+
+	def lines(self):
+		'The overlay text, one line per phase'
+		frames = list(self.recent)
+		if not frames:
+			return ['profiling...']
+		summary = self.summary(frames)
+		total = summary['frame']['mean']
+		lines = ['%-8s %6s %6s %6s %6s' % ('ms', 'mean', 'p95', 'p99', 'max')]
+		for name, stats in summary.items():
+			lines.append('%-8s %6.2f %6.2f %6.2f %6.2f' % (name, stats['mean'],
+				stats['p95'], stats['p99'], stats['max']))
+		lines.append('%.1f fps over %d frames' % (1000.0 / max(total, 1e-3), len(frames)))
+		counts = frames[-1][1]
+		if counts:
+			lines.append(' '.join('%s %d' % (name, counts[name]) for name in self.countNames if name in counts))
+		return lines
+
+	def display(self, screen):
+		'Draws the overlay in the bottom left corner, returns its rect'
+		if not self.enabled:
+			return None
+		now = timeit.default_timer()
+		if self.panel is None or now - self.panelTime > Profiler.refresh:
+			self.panelTime = now
+			images = [fonts.render(line, Profiler.color, Profiler.fontsize) for line in self.lines()]
+			width = max(image.get_width() for image in images) + 8
+			height = sum(image.get_height() for image in images) + 8
+			# never smaller, the old panel has to be covered
+			if self.panel is not None:
+				width = max(width, self.panel.get_width())
+				height = max(height, self.panel.get_height())
+			self.panel = pygame.Surface((width, height)).convert()
+			self.panel.fill(Profiler.background)
+			y = 4
+			for image in images:
+				self.panel.blit(image, (4, y))
+				y += image.get_height()
+		return screen.blit(self.panel, (0, screen.get_height() - self.panel.get_height()))
+
+	def save(self, path='profiles'):
+		'''Writes the frames timed since the last save to path as name.csv
+		(a row per frame) and name.json (the same and a summary), returns
+		the name'''
+		if not self.frames:
+			return None
+		if not os.path.isdir(path):
+			os.makedirs(path)
+		name = os.path.join(path, time.strftime('%Y%m%d-%H%M%S'))
+		times, counts = self.table(self.frames)
+		header = self.phases + ['frame'] + self.countNames
+
+		file = open(name + '.csv', 'w')
+		file.write(','.join(header) + '\n')
+		for row, frameCounts in zip(times, counts):
+			file.write(','.join(['%.4f' % value for value in row] +
+				['%d' % value for value in frameCounts]) + '\n')
+		file.close()
+
+		file = open(name + '.json', 'w')
+		json.dump({'columns': header, 'summary': self.summary(self.frames),
+			'frames': [list(row) + list(frameCounts) for row, frameCounts in
+				zip(np.round(times, 4).tolist(), counts.tolist())]}, file, indent=1)
+		file.close()
+		self.frames = []
+		return name
+
+# never turned on, headless games (the planner's copies of the one on
+# screen, training) time into this instead of the state's profiler
+off = Profiler()
@@ -0,0 +1,141 @@
+import pygame
+import numpy as np
+
+# star layers: share of all stars, brightness range and size in pixels
+starLayers = [
+	(0.85, 0, 256, 1),
+	(0.12, 64, 192, 1),
+	(0.03, 128, 256, 2)]
+
+def starfield(width, height, seed=0, density=38):
+	'''Returns a surface with a random (but for a seed always the same)
+	starfield, density is the number of stars per 100x100 pixels'''
+	rng = np.random.RandomState(seed)
+	pixels = np.zeros((width, height, 3), dtype=np.uint8)
+	total = int(width * height * density / 10000.0)
+
+	for share, low, high, size in starLayers:
+		count = int(total * share)
+		xs = rng.randint(0, width - size + 1, count)
+		ys = rng.randint(0, height - size + 1, count)
+		shade = rng.randint(low, high, count).astype(np.uint8)
+		for dx in range(size):
+			for dy in range(size):
+				pixels[xs + dx, ys + dy] = shade[:, np.newaxis]
+
+	return pygame.surfarray.make_surface(pixels)
+
+
+class DirtyRenderer:
+	'''Redraws only the parts of the screen that changed: things are drawn
+	into an alpha buffer as before, but only the rects drawn to this frame
+	and last frame are cleared, restored from the background and passed on
+	to pygame.display.update'''
+
+	# past this many rects one full screen redraw is cheaper
+	maxRects = 200
+
+	def __init__(self, bg, buff, enabled=True):
+		self.bg = bg
+		self.buff = buff
+		self.enabled = enabled
+		self.last = []
+		self.full = True
+
+	def invalidate(self):
+		'Makes the next frame a full redraw (after a menu or resize)'
+		self.full = True
+
+	def draw(self, screen, drawer):
+		'''drawer draws everything onto the surface it is given and returns
+		the rects it drew to, returns the changed rects or None when the
+		whole screen was redrawn'''
+		full = self.full or not self.enabled
+		if full:
+			self.buff.fill((0,0,0,0))
+		else:
+			for rect in self.last:
+				self.buff.fill((0,0,0,0), rect)
+
+		# rects of things that wrapped around can stick out of the screen
+		area = screen.get_rect()
+		rects = []
+		for rect in drawer(self.buff):
+			rect = rect.clip(area)
+			if rect.w > 0 and rect.h > 0:
+				rects.append(rect)
+
+		dirty = self.last + rects
+		self.last = rects
+		self.full = False
+
+		# full redraw
+		if full or len(dirty) > DirtyRenderer.maxRects:
+			screen.blit(self.bg, (0,0))
+			screen.blit(self.buff, (0,0))
+			return None
+
+		for rect in dirty:
+			screen.blit(self.bg, rect, rect)
+			screen.blit(self.buff, rect, rect)
+		return dirty
+
+
+class Window:
+	'''The window, showing a surface of a fixed (logical) size everything
+	draws to, whatever size the window is: scaled to fit, bars around it
+	if the aspect ratios differ. Changing the window never changes what
+	is drawn, and drawing at a lower resolution than the window is cheaper
+	on slow machines.
+
+	With SDL2 (pygame 2) SDL does the scaling (pygame.SCALED), otherwise
+	it is one scaled blit per frame, none if the sizes are the same.'''
+
+	scaled = getattr(pygame, 'SCALED', 0)
+
+	def __init__(self, size, windowSize, flags=0):
+		self.size = size
+		self.surface = None
+		self.setMode(windowSize, flags)
+
+	def setMode(self, windowSize, flags=0):
+		'''Opens (or changes) the window, with SDL2 scaling it is as big as
+		SDL makes it. The surface stays the same when it can'''
+		if Window.scaled:
+			self.window = pygame.display.set_mode(self.size, flags | Window.scaled)
+			self.surface = self.window
+			self.area = None
+			return
+
+		self.window = pygame.display.set_mode(windowSize, flags)
+		if windowSize == self.size:
+			self.surface = self.window
+			self.area = None
+			return
+
+		# the biggest that fits, in the middle
+		width, height = self.size
+		scale = min(windowSize[0] / float(width), windowSize[1] / float(height))
+		fit = pygame.Rect(0, 0, int(width * scale), int(height * scale))
+		fit.center = (windowSize[0] / 2, windowSize[1] / 2)
+		self.window.fill((0,0,0))
+		pygame.display.flip()
+		self.area = self.window.subsurface(fit)
+		if self.surface is None or self.surface is self.window or self.surface.get_size() != self.size:
+			self.surface = pygame.Surface(self.size).convert()
+
+	def show(self, rects=None):
+		'''Puts what was drawn on the surface in the window, only rects
+		(of the surface) if given, otherwise all of it'''
+		if self.area is None:
+			if rects is None:
+				pygame.display.flip()
+			else:
+				pygame.display.update(rects)
+			return
+
+		# nothing changed
+		if rects is not None and not rects:
+			return
+		pygame.transform.scale(self.surface, self.area.get_size(), self.area)
+		pygame.display.update(self.area.get_abs_offset() + self.area.get_size())
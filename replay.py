@@ -0,0 +1,205 @@
+import sys, struct, zlib, array, timeit
+import pygame
+import games as g
+
+# a replay file is a header followed by the zlib compressed actions,
+# one 16 bit action bitmask (see games) per player per tick
+magic = 'SWR1'
+version = 1
+header = struct.Struct('<4sB8sBHHIIHHI')
+
+
+class Recorder:
+	'Collects the actions of every tick of a game, to be saved as replay'
+
+	def __init__(self, game, path):
+		self.game = game
+		self.path = path
+		self.actions = array.array('H')
+
+	def record(self, actions):
+		self.actions.extend(actions)
+
+	def save(self):
+		'Writes (or rewrites) the replay file for everything so far'
+		game = self.game
+		players = len(game.players)
+		actions = array.array('H', self.actions)
+		if sys.byteorder != 'little':
+			actions.byteswap()
+
+		data = header.pack(magic, version, game.name,
+			players, game.world.width, game.world.height, game.seed,
+			game.state.starSeed, game.state.gravityGrid, game.state.tickRate,
+			len(actions) // players)
+
+		file = open(self.path, 'wb')
+		file.write(data)
+		file.write(zlib.compress(actions.tostring(), 9))
+		file.close()
+
+
+class Replay:
+	'A replay file read into memory'
+
+	def __init__(self, path):
+		file = open(path, 'rb')
+		data = file.read()
+		file.close()
+
+		fields = header.unpack_from(data)
+		if fields[0] != magic or fields[1] != version:
+			raise ValueError('%s is not a replay this version can play' % path)
+
+		(self.gameType, self.players, self.width, self.height, self.seed,
+			self.starSeed, self.gravityGrid, self.tickRate, self.ticks) = fields[2:]
+
+		self.actions = array.array('H')
+		self.actions.fromstring(zlib.decompress(data[header.size:]))
+		if sys.byteorder != 'little':
+			self.actions.byteswap()
+
+	def tickActions(self, tick):
+		'The action bitmask of each player for a tick'
+		return self.actions[tick * self.players:(tick + 1) * self.players].tolist()
+
+	def createGame(self, state=None):
+		'''Sets up the recorded game from its seed, headless unless given a
+		(spacewar) state to display it with'''
+		cls = g.types[self.gameType.rstrip('\0')]
+		if state is None:
+			return cls(g.Arena(self.width, self.height, self.gravityGrid), True, self.seed, self.players)
+
+		state.setWorld(self.width, self.height)
+		state.starSeed = self.starSeed
+		state.gravityGrid = self.gravityGrid
+		state.tickRate = self.tickRate
+		return cls(state, False, self.seed, self.players)
+
+
+class Playback:
+	'''Runs a replay through its game, as fast as possible or shown on screen
+	at any speed, keyframes taken along the way make seeking back cheap'''
+
+	# ticks between keyframes
+	keyframeInterval = 300
+
+	def __init__(self, replay, game):
+		self.replay = replay
+		self.game = game
+		self.tick = 0
+		self.keyframes = {0: game.getState()}
+
+		# when shown on screen
+		self.speed = 1.0
+		self.paused = False
+		self.lastTime = None
+		self.lag = 0.0
+
+	def step(self):
+		'Plays one tick, returns False at the end of the replay'
+		if self.tick >= self.replay.ticks:
+			return False
+		self.game.step(self.replay.tickActions(self.tick))
+		self.tick += 1
+		if self.tick % Playback.keyframeInterval == 0 and self.tick not in self.keyframes:
+			self.keyframes[self.tick] = self.game.getState()
+		return True
+
+	def run(self, ticks=None):
+		'Plays ticks (all that are left by default) as fast as we can'
+		end = self.replay.ticks if ticks is None else min(self.tick + ticks, self.replay.ticks)
+		while self.tick < end:
+			self.step()
+
+	def seek(self, tick):
+		'Goes to tick, from the closest keyframe before it'
+		tick = max(0, min(tick, self.replay.ticks))
+
+		# unless playing on from here gets there quicker
+		start = max(key for key in self.keyframes if key <= tick)
+		if tick < self.tick or start > self.tick:
+			self.game.setState(self.keyframes[start])
+			self.tick = start
+		self.run(tick - self.tick)
+
+	def invalidate(self):
+		self.game.invalidate()
+		self.lastTime = None
+
+	def loop(self, screen):
+		'''Shows the replay: left/right seek 5 seconds, up/down change speed,
+		space pauses, escape quits'''
+		second = self.replay.tickRate
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				return False
+			if event.type == pygame.KEYDOWN:
+				if event.key == pygame.K_ESCAPE:
+					return False
+				elif event.key == pygame.K_SPACE:
+					self.paused = not self.paused
+				elif event.key == pygame.K_UP:
+					self.speed *= 2
+				elif event.key == pygame.K_DOWN:
+					self.speed /= 2
+				elif event.key == pygame.K_LEFT:
+					self.seek(self.tick - 5 * second)
+				elif event.key == pygame.K_RIGHT:
+					self.seek(self.tick + 5 * second)
+
+		now = timeit.default_timer()
+		if self.lastTime is not None and not self.paused:
+			self.lag += (now - self.lastTime) * second * self.speed
+		self.lastTime = now
+		while self.lag >= 1:
+			self.step()
+			self.lag -= 1
+
+		self.game.alpha = min(self.lag, 1.0)
+		return self.game.display(screen)
+
+
+def main(args):
+	'''python replay.py [--headless] [--speed N] file
+	plays a replay on screen, or headless printing how it ended'''
+	headless = '--headless' in args
+	speed = 1.0
+	if '--speed' in args:
+		speed = float(args[args.index('--speed') + 1])
+	replay = Replay(args[-1])
+
+	if headless:
+		start = timeit.default_timer()
+		playback = Playback(replay, replay.createGame())
+		playback.run()
+		took = timeit.default_timer() - start
+		print('%d ticks in %.2fs (%d ticks/s), winner: %s' %
+			(playback.tick, took, playback.tick / max(took, 1e-9), playback.game.winner))
+		return
+
+	import spacewar as sw
+	import fonts
+	import render
+	pygame.init()
+	state = sw.State()
+	# drawn at the size of the replay's world when it fits, the window
+	# has to be open before the game is made
+	state.setWorld(replay.width, replay.height)
+	window = render.Window(state.size, state.windowSize(), state.fullscreen)
+	state.screen = window.surface
+	fonts.get(12)
+	playback = Playback(replay, replay.createGame(state))
+	playback.speed = speed
+	playback.invalidate()
+	clock = pygame.time.Clock()
+
+	while True:
+		rects = playback.loop(state.screen)
+		if rects is False:
+			break
+		window.show(rects)
+		clock.tick(state.fps)
+	pygame.quit()
+
+if __name__ == '__main__': main(sys.argv[1:])
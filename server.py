@@ -0,0 +1,541 @@
+import sys, socket, select, struct, zlib, json, timeit, multiprocessing
+import numpy as np
+import pygame
+import games as g
+import snapshot
+import netplay
+import bots
+import cli
+
+# packets, the first byte says which kind:
+#   join      client to server, the game type it wants and whether a bot
+#             takes the other seat rather than waiting for a second player
+#   welcome   the match and seat we got, and how to set the game up
+#   redirect  (workers only) ask the worker on this port instead
+#   refused   no room for another match
+#   input     our action, and the newest state we got
+#   state     the game at a tick, xor'ed with the state at base (which the
+#             client has) and compressed, base is none for a full state
+#   leave     client to server, we're done
+#   status    anyone to server, answered with a json report
+JOIN, WELCOME, REDIRECT, REFUSED, INPUT, STATE, LEAVE, STATUS = range(1, 9)
+join = struct.Struct('<B8sB')
+welcome = struct.Struct('<BIB8sIHHHH')
+redirect = struct.Struct('<BH')
+kind = struct.Struct('<B')
+inputs = struct.Struct('<BIIH')
+state = struct.Struct('<BIII')
+none = 0xffffffff
+
+# where clients aren't told otherwise
+port = 5000
+
+
+def delta(base, data):
+	'''Xor of a state with the one before, states hardly change between
+	ticks so this is mostly zero bytes that compress to almost nothing'''
+	data = np.frombuffer(data, dtype=np.uint8)
+	if base is not None:
+		base = np.frombuffer(base, dtype=np.uint8)[:len(data)]
+		data = data.copy()
+		data[:len(base)] ^= base
+	return zlib.compress(data.tostring(), 1)
+
+def undelta(base, packed):
+	'Gets the state back from what delta made of it'
+	data = np.frombuffer(zlib.decompress(packed), dtype=np.uint8)
+	if base is not None:
+		base = np.frombuffer(base, dtype=np.uint8)[:len(data)]
+		data = data.copy()
+		data[:len(base)] ^= base
+	return data.tostring()
+
+
+class Match:
+	'One game on the server, with a client (or bot) in each seat'
+
+	# states kept to send deltas against
+	historySize = 64
+
+	def __init__(self, id, cls, arena, seed=None):
+		self.id = id
+		self.game = cls(arena, True, seed)
+		self.seats = [None] * len(self.game.players) # client addresses
+		self.bots = [None] * len(self.game.players)
+		self.actions = [0] * len(self.game.players)
+		self.acks = {}     # newest tick each client has
+		self.seen = {}     # when we last heard from each client
+		self.history = {}  # tick to packed state
+		self.tick = 0
+		self.cost = 0.0    # seconds a tick takes, averaged
+		self.over = None   # when the game was won
+
+	def free(self):
+		'The first empty seat or None'
+		for i in range(len(self.seats)):
+			if self.seats[i] is None and self.bots[i] is None:
+				return i
+		return None
+
+	def ready(self):
+		return self.free() is None
+
+	def step(self, now):
+		start = timeit.default_timer()
+		actions = list(self.actions)
+		for i, bot in enumerate(self.bots):
+			if bot is not None:
+				actions[i] = bot.act(self.game, i)
+		self.game.step(actions)
+		self.tick += 1
+		self.history[self.tick] = snapshot.save(self.game).astype('<f8').tostring()
+		self.history.pop(self.tick - Match.historySize, None)
+		took = timeit.default_timer() - start
+		self.cost = took if self.tick == 1 else self.cost * 0.95 + took * 0.05
+
+		if self.game.winner != False and self.over is None:
+			self.over = now
+
+	def packet(self, address):
+		'The state for a client, against the newest one it has'
+		base = self.acks.get(address)
+		if base not in self.history:
+			base = None
+		return state.pack(STATE, self.id, self.tick, none if base is None else base) + \
+			delta(self.history.get(base), self.history[self.tick])
+
+
+class Server:
+	'''Runs many matches in one process, all ticked together on one clock,
+	clients send inputs and get (delta compressed) states over UDP.
+	The time ticks take is tracked per match, a new match is only started
+	if it fits in what is left of the tick.'''
+
+	tickRate = 60
+	# part of each tick we're willing to spend simulating
+	budget = 0.8
+	# ticks between states sent out
+	sendEvery = 2
+	# seconds before a quiet client is dropped, and a won game closes
+	timeout = 10.0
+	linger = 5.0
+	# seconds between reports
+	reportEvery = 5.0
+
+	def __init__(self, port=0, width=1024, height=768, gravityGrid=0, verbose=True):
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.bind(('', port))
+		self.socket.setblocking(0)
+		self.port = self.socket.getsockname()[1]
+		self.arena = g.Arena(width, height, gravityGrid)
+		self.arena.tickRate = Server.tickRate
+		self.tickTime = 1.0 / Server.tickRate
+		self.verbose = verbose
+
+		self.matches = {}
+		self.clients = {} # address to (match, seat)
+		self.nextId = 1
+		self.ticks = 0
+		self.sent = 0
+		self.bytes = 0
+
+	def cost(self):
+		'Seconds all matches take per tick'
+		return sum(match.cost for match in self.matches.values())
+
+	def load(self):
+		'Part of the tick budget in use'
+		return self.cost() / (self.tickTime * Server.budget)
+
+	def estimate(self):
+		'What another match would cost, going by the ones we have'
+		running = [match.cost for match in self.matches.values() if match.tick > 0]
+		if not running:
+			return 0.0
+		return sum(running) / len(running)
+
+	def canHost(self):
+		return self.cost() + self.estimate() <= self.tickTime * Server.budget
+
+	def create(self, cls, seed=None):
+		'Starts a match if there is room for it, returns it or None'
+		if not self.canHost():
+			return None
+		match = Match(self.nextId, cls, self.arena, seed)
+		self.matches[match.id] = match
+		self.nextId += 1
+		return match
+
+	def send(self, data, address):
+		try:
+			self.socket.sendto(data, address)
+		except socket.error:
+			return
+		self.sent += 1
+		self.bytes += len(data)
+
+	def seat(self, address, name, bot):
+		'Finds (or starts) a match for a client that wants to join'
+		cls = g.types.get(name, g.Game)
+		match = None
+		if not bot:
+			for waiting in self.matches.values():
+				if waiting.game.__class__ is cls and not waiting.ready():
+					match = waiting
+					break
+		if match is None:
+			match = self.create(cls)
+			if match is None:
+				return None
+		i = match.free()
+		match.seats[i] = address
+		match.seen[address] = timeit.default_timer()
+		if bot:
+			match.bots[match.free()] = bots.Gunner()
+		self.clients[address] = (match, i)
+		return match, i
+
+	def receive(self):
+		now = timeit.default_timer()
+		while True:
+			try:
+				data, address = self.socket.recvfrom(2048)
+			except socket.error:
+				return
+			if not data:
+				continue
+			which = ord(data[0])
+
+			if which == INPUT and len(data) >= inputs.size and address in self.clients:
+				which, id, ack, action = inputs.unpack_from(data)
+				match, i = self.clients[address]
+				match.actions[i] = action
+				match.seen[address] = now
+				if ack <= match.tick:
+					match.acks[address] = max(ack, match.acks.get(address, 0))
+
+			elif which == JOIN and len(data) >= join.size:
+				if address not in self.clients:
+					which, name, bot = join.unpack_from(data)
+					if self.seat(address, name.rstrip('\0'), bot) is None:
+						self.send(kind.pack(REFUSED), address)
+						continue
+				match, i = self.clients[address]
+				arena = self.arena
+				self.send(welcome.pack(WELCOME, match.id, i, match.game.name, match.game.seed,
+					arena.width, arena.height, arena.gravityGrid, arena.tickRate), address)
+
+			elif which == LEAVE and address in self.clients:
+				self.drop(address)
+
+			elif which == STATUS:
+				self.send(json.dumps(self.status()), address)
+
+	def drop(self, address):
+		match, i = self.clients.pop(address)
+		match.seats[i] = None
+		match.actions[i] = 0
+		match.acks.pop(address, None)
+		match.seen.pop(address, None)
+
+	def tick(self):
+		'Runs a tick of every match that has its players, closes finished ones'
+		now = timeit.default_timer()
+		self.ticks += 1
+		for match in self.matches.values():
+			for address, seen in match.seen.items():
+				if now - seen > Server.timeout:
+					self.drop(address)
+
+			if match.over is not None and now - match.over > Server.linger or \
+				match.tick > 0 and not match.seen:
+				for address in match.seen.keys():
+					self.drop(address)
+				del self.matches[match.id]
+			elif match.ready():
+				match.step(now)
+
+		if self.ticks % Server.sendEvery == 0:
+			for address, (match, i) in self.clients.items():
+				if match.tick > 0:
+					self.send(match.packet(address), address)
+
+	def status(self):
+		return {
+			'port': self.port,
+			'matches': len(self.matches),
+			'clients': len(self.clients),
+			'load': self.load(),
+			'costs': dict((match.id, match.cost * 1000) for match in self.matches.values())}
+
+	def report(self):
+		costs = [match.cost * 1000 for match in self.matches.values()]
+		print('port %d: %d matches, %d clients, %.2fms a tick (%d%% of budget), '
+			'most %.2fms, %d bytes a packet' % (self.port, len(self.matches), len(self.clients),
+			sum(costs), self.load() * 100, max(costs or [0]), self.bytes / max(self.sent, 1)))
+
+	def run(self, load=None, index=0):
+		'''Serves until interrupted, publishing our load to load[index]
+		when we're one of several workers'''
+		next = timeit.default_timer()
+		reported = next
+		while True:
+			wait = max(0.0, next - timeit.default_timer())
+			readable = select.select([self.socket], [], [], wait)[0]
+			if readable:
+				self.receive()
+
+			now = timeit.default_timer()
+			if now >= next:
+				self.tick()
+				next += self.tickTime
+				if now - next > 0.25:
+					# way behind, don't try to catch up
+					next = now
+				if load is not None:
+					load[index] = self.load() if self.canHost() else 1.0
+
+			if self.verbose and now - reported >= Server.reportEvery:
+				reported = now
+				self.report()
+
+
+def serve(port, load, index, width, height, gravityGrid):
+	Server(port, width, height, gravityGrid).run(load, index)
+
+def front(port, workers, width=1024, height=768, gravityGrid=0):
+	'''Starts a server process per worker (on the ports after ours) and
+	sends joining clients to the one with the most room left'''
+	load = multiprocessing.Array('d', workers)
+	processes = []
+	for i in range(workers):
+		process = multiprocessing.Process(target=serve,
+			args=(port + 1 + i, load, i, width, height, gravityGrid))
+		process.daemon = True
+		process.start()
+		processes.append(process)
+
+	sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	sock.bind(('', port))
+	print('%d workers on ports %d-%d' % (workers, port + 1, port + workers))
+	while True:
+		data, address = sock.recvfrom(2048)
+		if not data:
+			continue
+		which = ord(data[0])
+		if which == JOIN:
+			loads = load[:]
+			best = min(range(workers), key=lambda i: loads[i])
+			if loads[best] >= 1.0:
+				sock.sendto(kind.pack(REFUSED), address)
+			else:
+				sock.sendto(redirect.pack(REDIRECT, port + 1 + best), address)
+		elif which == STATUS:
+			sock.sendto(json.dumps({'workers': load[:]}), address)
+
+
+class Client:
+	'''Joins a match on a server, sends our action and keeps a local copy
+	of the game up to date with the states it sends back'''
+
+	def __init__(self, address, local=0):
+		self.link = netplay.UdpLink(local, address)
+		self.match = None
+		self.seat = None
+		self.game = None
+		self.states = {} # tick to state, to undo deltas against
+		self.tick = 0
+		self.refused = False
+
+	def join(self, name='classic', bot=False, arena=None, timeout=5.0):
+		'''Asks for a seat, following redirects, returns the settings of
+		the match (type, seed, width, height, gravityGrid, tickRate) or None'''
+		start = timeit.default_timer()
+		while timeit.default_timer() - start < timeout:
+			self.link.send(join.pack(JOIN, name, bot))
+			deadline = timeit.default_timer() + 0.25
+			while timeit.default_timer() < deadline:
+				for data in self.link.receive():
+					which = ord(data[0])
+					if which == REFUSED:
+						self.refused = True
+						return None
+					elif which == REDIRECT:
+						self.link.peer = (self.link.peer[0], redirect.unpack_from(data)[1])
+						# the worker is a new peer, the receive filter follows it
+						deadline = 0
+					elif which == WELCOME:
+						fields = welcome.unpack_from(data)
+						self.match, self.seat = fields[1:3]
+						return (fields[3].rstrip('\0'),) + fields[4:]
+				pygame.time.wait(5)
+		return None
+
+	def send(self, action):
+		self.link.send(inputs.pack(INPUT, self.match, self.tick, action))
+
+	def poll(self):
+		'Reads the states that came in, returns True if the game changed'
+		newest = None
+		for data in self.link.receive():
+			if ord(data[0]) != STATE or len(data) < state.size:
+				continue
+			which, match, tick, base = state.unpack_from(data)
+			if tick <= self.tick or base != none and base not in self.states:
+				continue
+			self.states[tick] = undelta(self.states.get(base), data[state.size:])
+			newest = tick if newest is None else max(newest, tick)
+
+		if newest is None:
+			return False
+		self.tick = newest
+		for old in [stored for stored in self.states if stored < newest - Match.historySize]:
+			del self.states[old]
+		if self.game is not None:
+			snapshot.restore(self.game, np.frombuffer(self.states[newest], dtype='<f8').astype(float))
+		return True
+
+	def leave(self):
+		self.link.send(kind.pack(LEAVE))
+		self.link.close()
+
+
+class ClientGame:
+	'Shows a Client game, with either set of keys steering our ship'
+
+	def __init__(self, client):
+		self.client = client
+		self.game = client.game
+
+	def invalidate(self):
+		self.game.invalidate()
+
+	def loop(self, screen):
+		actions = self.game.readInput()
+		if self.game.paused:
+			return False
+		self.client.send(actions[0] | actions[1])
+		self.client.poll()
+		return self.game.display(screen)
+
+
+def test(clients=6, ticks=600, seed=1):
+	'''A server with a few bot matches over loopback, every client has to
+	end up with the exact state the server has for the tick it's at'''
+	server = Server(verbose=False)
+	address = ('127.0.0.1', server.port)
+	players = [Client(address) for i in range(clients)]
+	random = [bots.RandomBot(seed + i) for i in range(clients)]
+
+	for i, client in enumerate(players):
+		# the first four play each other, the rest a bot on the server
+		client.link.send(join.pack(JOIN, 'random', i >= 4))
+	pygame.time.wait(50)
+	server.receive()
+	pygame.time.wait(50)
+	for client in players:
+		fields = None
+		for data in client.link.receive():
+			if ord(data[0]) == WELCOME:
+				fields = welcome.unpack_from(data)
+		client.match, client.seat = fields[1:3]
+		client.game = g.types[fields[3].rstrip('\0')](g.Arena(*fields[5:8]), True, fields[4])
+
+	start = timeit.default_timer()
+	for tick in range(ticks):
+		for client, bot in zip(players, random):
+			client.send(bot.act())
+		pygame.time.wait(1)
+		server.receive()
+		server.tick()
+		pygame.time.wait(1)
+		for client in players:
+			client.poll()
+	took = timeit.default_timer() - start
+
+	same = 0
+	for client in players:
+		match = server.matches[client.match]
+		if snapshot.save(client.game).astype('<f8').tostring() == match.history.get(client.tick):
+			same += 1
+	full = sum(len(state) for state in (m.history[m.tick] for m in server.matches.values()))
+	print('%d of %d clients in sync, %d matches, %d bytes a packet (full states %d bytes), '
+		'%d ticks in %.2fs' % (same, clients, len(server.matches), server.bytes / max(server.sent, 1),
+		full / max(len(server.matches), 1), ticks, took))
+	server.report()
+
+def bench(ticks=120):
+	'''Starts bot matches on one server until it can't fit another,
+	that is how many matches one core can host'''
+	server = Server(verbose=False)
+	while server.create(g.RandomGame) is not None:
+		match = server.matches[server.nextId - 1]
+		match.bots = [bots.RandomBot(match.id * 2), bots.RandomBot(match.id * 2 + 1)]
+		# let the newcomer build up some bullets before measuring again
+		for tick in range(ticks):
+			now = timeit.default_timer()
+			for match in server.matches.values():
+				match.step(now)
+
+	# matches get costlier as bullets pile up, the last few may not fit after all
+	while server.load() > 1.0:
+		del server.matches[server.nextId - 1]
+		server.nextId -= 1
+	server.report()
+	print('%d matches fit in %d%% of a %dHz tick' % (len(server.matches),
+		Server.budget * 100, Server.tickRate))
+
+
+def main(args):
+	'''python server.py [--port N] [--workers N] [--test] [--bench]
+	python server.py --connect host:port [--random] [--bot]
+	runs a server (or a front for several worker processes), or joins
+	one to play, --bench tells how many matches one process can host'''
+	option = cli.options(args)
+
+	if '--test' in args:
+		test()
+	elif '--bench' in args:
+		bench()
+	elif '--connect' in args:
+		import spacewar as sw
+		import menus as m
+		import fonts
+		import render
+		host, remote = option('--connect', None, str).rsplit(':', 1)
+		client = Client((socket.gethostbyname(host), int(remote)))
+		settings = client.join('random' if '--random' in args else 'classic', '--bot' in args)
+		if settings is None:
+			print('the server is full' if client.refused else 'no answer from the server')
+			return
+		name, seed, width, height, gravityGrid, tickRate = settings
+
+		pygame.init()
+		state = sw.State()
+		state.setWorld(width, height)
+		state.gravityGrid = gravityGrid
+		state.tickRate = tickRate
+		window = render.Window(state.size, state.windowSize(), state.fullscreen)
+		state.screen = window.surface
+		fonts.get(m.Menu.fontsize, True)
+		fonts.get(12)
+		client.game = g.types[name](state, False, seed)
+		shown = ClientGame(client)
+		shown.invalidate()
+		clock = pygame.time.Clock()
+		while True:
+			rects = shown.loop(state.screen)
+			if rects is False:
+				break
+			window.show(rects)
+			clock.tick(state.fps)
+		client.leave()
+		pygame.quit()
+	elif '--workers' in args:
+		front(option('--port', port), option('--workers', 1))
+	else:
+		server = Server(option('--port', port))
+		print('serving on port %d' % server.port)
+		server.run()
+
+if __name__ == '__main__': main(sys.argv[1:])
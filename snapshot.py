@@ -0,0 +1,215 @@
+import struct, array, operator
+import numpy as np
+import bullets as b
+import games as g
+
+# a snapshot is one flat array of doubles:
+#   winner, players, bullets, bullet colors, random version and gauss (or NaN)
+#   per player the values in playerNames, system, rate and orig
+#   per bullet color its RGBA
+#   the 625 words of the random generator, as 32 bit ints (313 doubles)
+#   per BulletField.names one column with a value per bullet
+
+# plain values of a Player that change during a game
+playerNames = ['x', 'y', 'vx', 'vy', 'px', 'py', 'rot', 'lives',
+	'accelerating', 'shooting', 'shieldUp', 'cursysnum', 'hits', 'wellDeaths']
+# in the order of Player.system, spelled out as classes is still
+# being loaded when games imports us
+sysnames = ['hull', 'ammo', 'shield', 'engine', 'jump']
+playerSize = len(playerNames) + 5 + 5 + 3
+randomWords = 625
+randomSize = (randomWords + 1) // 2
+headerSize = 6
+
+getPlayer = operator.attrgetter(*playerNames)
+
+# values stored as doubles that the game expects to be ints
+intNames = set(['lives', 'accelerating', 'shooting', 'shieldUp', 'cursysnum',
+	'hits', 'wellDeaths'])
+
+# snapshot files: magic, game type, seed, width, height, gravity grid, doubles
+fileHeader = struct.Struct('<4s8sIHHHI')
+magic = 'SWS1'
+
+# converting the random state is most of the work, and it rarely
+# changes from one tick to the next: keep the last one converted, as
+# (words, packed). Games in other threads (netplay --local) share it, so
+# it is only ever replaced whole and read once into locals
+lastRandom = (None, None)
+
+def winnerCode(game):
+	'0 while playing, 1 for a tie, 2 + index of the player that won'
+	if game.winner == False:
+		return 0
+	for i in range(len(game.players)):
+		if game.winner == 'Player %d has won!' % (i + 1):
+			return 2 + i
+	return 1
+
+def setWinner(game, code):
+	if code == 0:
+		game.winner = False
+		game.textcolor = (255,255,255)
+	elif code == 1:
+		game.winner = "It's a Tie!"
+		game.textcolor = (255,255,255)
+	else:
+		game.winner = 'Player %d has won!' % (code - 1)
+		game.textcolor = game.players[code - 2].color
+
+def save(game):
+	'Packs everything that changes during a game into one array'
+	global lastRandom
+	players = game.players
+	field = game.bullets
+	n = field.count
+	colors = field.colors
+	version, words, gauss = game.random.getstate()
+
+	start = headerSize + len(players) * playerSize + len(colors) * 4
+	end = start + randomSize
+	snap = np.empty(end + len(b.BulletField.names) * n)
+
+	values = [winnerCode(game), len(players), n, len(colors), version,
+		float('nan') if gauss is None else gauss]
+	for player in players:
+		system = player.system
+		rate = player.rate
+		orig = player.orig
+		values.extend(getPlayer(player))
+		values.extend([system[name] for name in sysnames])
+		values.extend([rate[name] for name in sysnames])
+		values.extend([orig['x'], orig['y'], orig['rot']])
+	for color in colors:
+		values.extend(color)
+	snap[:start] = values
+
+	cachedWords, cachedPacked = lastRandom
+	if words != cachedWords:
+		cachedPacked = array.array('I', words).tostring()
+		lastRandom = (words, cachedPacked)
+	packed = snap[start:end].view(np.uint32)
+	packed[:randomWords] = np.frombuffer(cachedPacked, dtype=np.uint32)
+	packed[randomWords:] = 0
+
+	if n:
+		np.concatenate([getattr(field, name)[:n] for name in b.BulletField.names],
+			out=snap[end:])
+	return snap
+
+def restore(game, snap):
+	'Puts a game back into the state a snapshot was taken in'
+	global lastRandom
+	header = snap[:headerSize].tolist()
+	code, count, n, colorCount, version = [int(v) for v in header[:5]]
+	gauss = header[5]
+
+	pos = headerSize
+	values = snap[pos:pos + count * playerSize + colorCount * 4].tolist()
+	pos = 0
+	for player in game.players[:count]:
+		for name in playerNames:
+			value = values[pos]
+			setattr(player, name, int(value) if name in intNames else value)
+			pos += 1
+		system = player.system
+		for name in sysnames:
+			system[name] = values[pos]
+			pos += 1
+		rate = player.rate
+		for name in sysnames:
+			rate[name] = values[pos]
+			pos += 1
+		player.orig['x'], player.orig['y'], player.orig['rot'] = values[pos:pos + 3]
+		pos += 3
+
+	field = game.bullets
+	field.colors = [tuple(int(v) for v in values[i:i + 4])
+		for i in range(pos, pos + colorCount * 4, 4)]
+	pos += colorCount * 4 + headerSize
+
+	packed = snap[pos:pos + randomSize].view(np.uint32)[:randomWords].tostring()
+	cachedWords, cachedPacked = lastRandom
+	if packed != cachedPacked:
+		cachedWords = tuple(array.array('I', packed))
+		lastRandom = (cachedWords, packed)
+	game.random.setstate((version, cachedWords, None if gauss != gauss else gauss))
+	pos += randomSize
+
+	if n > field.capacity:
+		field.allocate(max(n, field.capacity * 2))
+	for name in b.BulletField.names:
+		getattr(field, name)[:n] = snap[pos:pos + n]
+		pos += n
+	field.count = n
+
+	setWinner(game, code)
+
+def write(game, path):
+	'Saves a game to disk, to be picked up again later with read'
+	snap = save(game)
+	world = game.world
+	file = open(path, 'wb')
+	file.write(fileHeader.pack(magic, game.name, game.seed, world.width,
+		world.height, game.state.gravityGrid, len(snap)))
+	file.write(snap.astype('<f8').tostring())
+	file.close()
+
+def read(path, state=None):
+	'''Makes the game saved by write, headless unless given a state to
+	display it with, its layout (the wells) comes from its seed'''
+	file = open(path, 'rb')
+	data = file.read()
+	file.close()
+
+	fields = fileHeader.unpack_from(data)
+	if fields[0] != magic:
+		raise ValueError('%s is not a saved game' % path)
+	name, seed, width, height, gravityGrid, size = fields[1:]
+
+	snap = np.frombuffer(data, dtype='<f8', count=size, offset=fileHeader.size)
+	players = int(snap[1])
+	cls = g.types[name.rstrip('\0')]
+	if state is None:
+		game = cls(g.Arena(width, height, gravityGrid), True, seed, players)
+	else:
+		game = cls(state, False, seed, players)
+
+	restore(game, snap.astype(float))
+	return game
+
+
+if __name__ == '__main__':
+	# python snapshot.py: plays bot games, rolls each back (as netplay
+	# does) and plays the same ticks again, which has to end up exactly
+	# where it was. Bullets drawn after a rollback keep their ship's color
+	import bots
+
+	for name in ('classic', 'random'):
+		for seed in range(4):
+			game = g.types[name](g.Arena(), True, seed)
+			players = [bots.Gunner(seed * 2), bots.Dodger(seed * 2 + 1)]
+			ticks = []
+			for tick in range(600):
+				if tick == 300:
+					start = save(game)
+				ticks.append([bot.act(game, i) for i, bot in enumerate(players)])
+				game.step(ticks[-1])
+			end = save(game)
+			restore(game, start)
+			for actions in ticks[300:]:
+				game.step(actions)
+			# tostring, NaN (no gauss yet) never equals itself
+			assert save(game).tostring() == end.tostring(), (name, seed)
+
+	# player 2 fires first after going back to before any bullet
+	game = g.Game(g.Arena(), True, 0)
+	empty = save(game)
+	game.step([g.SHOOT, 0])
+	game.bullets.sprite(0, 1)
+	restore(game, empty)
+	game.step([0, g.SHOOT])
+	field = game.bullets
+	assert field.colors == [game.players[1].color]
+	assert tuple(field.sprite(0, 1).get_at((4, 4)))[:3] == game.players[1].color[:3]
+	print('8 games rolled back and played again the same, bullet colors kept')
@@ -1,8 +1,15 @@
-import pygame, os, sys, math
+import pygame, os, sys, math, time
 import ConfigParser 
-import classes as c
 import games as g
 import menus as m 
+import fonts
+import replay
+import profiler
+import render
+
+# window sizes for the aspect ratios
+ratios = ['4x3', '16x9', '16x10']
+windowSizes = {'4x3': (1024,768), '16x9': (1280,720), '16x10': (1280,800)}
 
 def singleton(cls):
 	instances = {}
@@ -18,24 +25,43 @@ class State:
 		self.mainMenu = None
 		self.current = None
 		self.game = None
-		self.screen = None
+		self.window = None
+		self.screen = None # what everything draws to, see render.Window
 
 		self.fullscreen = 0
 		self.ratio = '4x3'
+		self.resolution = None # size drawn at, None for the window's size
+		self.gravityGrid = 0 # 0 is exact gravity, otherwise grid spacing
+		self.worldSize = None # (width, height) of a world bigger than the screen
+		self.dirtyRects = True
+		self.starSeed = 0
+		self.starDensity = 38 # stars per 100x100 pixels
+		self.tickRate = 60 # simulation ticks per second, physics is tuned for 60
+		self.fps = 60 # most frames drawn per second, 0 for no limit
+		self.record = False # save a replay of every game
+		self.replayDir = 'replays'
+		self.profiler = profiler.Profiler() # F3 shows it, F4 saves what it timed
+		self.profileDir = 'profiles'
 		self.readSettings()
 		self.setSizeWidthHeight()
 
-	def setSizeWidthHeight(self):
-		self.width = 1024
-		self.height = 768
-		if self.ratio == '16x9':
-			self.width = 1280
-			self.height = 720
-		elif self.ratio == '16x10':
-			self.width = 1200
-			self.height = 800
-		self.size = (self.width, self.height)
+	def windowSize(self):
+		return windowSizes.get(self.ratio, windowSizes['4x3'])
 
+	def setSizeWidthHeight(self):
+		'''The size drawn at, it stays the same when the window changes. A
+		resolution only changes that, the world is still the window's size'''
+		self.size = (self.width, self.height) = self.resolution or self.windowSize()
+		if self.worldSize is None and self.size != self.windowSize():
+			self.worldSize = self.windowSize()
+
+	def setWorld(self, width, height):
+		'''Plays a world width x height (of a replay or a peer): on a screen
+		that size, or through the camera when it doesn't fit the screen'''
+		self.setSizeWidthHeight()
+		self.worldSize = (width, height)
+		if width <= self.width and height <= self.height:
+			self.size = (self.width, self.height) = self.worldSize
 	
 	def readSettings(self):
 		parser = ConfigParser.SafeConfigParser()
@@ -49,6 +75,33 @@ class State:
 
 			if parser.has_option('video', 'ratio'):
 				self.ratio = parser.get('video', 'ratio')
+			if parser.has_option('video', 'resolution'):
+				width, height = parser.get('video', 'resolution').split('x')
+				self.resolution = (int(width), int(height))
+
+			if parser.has_option('video', 'dirtyrects'):
+				self.dirtyRects = parser.getboolean('video', 'dirtyrects')
+
+			if parser.has_option('video', 'starseed'):
+				self.starSeed = parser.getint('video', 'starseed')
+			if parser.has_option('video', 'stardensity'):
+				self.starDensity = parser.getint('video', 'stardensity')
+
+			if parser.has_option('game', 'gravitygrid'):
+				self.gravityGrid = parser.getint('game', 'gravitygrid')
+			if parser.has_option('game', 'world'):
+				width, height = parser.get('game', 'world').split('x')
+				self.worldSize = (int(width), int(height))
+			if parser.has_option('game', 'tickrate'):
+				self.tickRate = parser.getint('game', 'tickrate')
+			if parser.has_option('video', 'fps'):
+				self.fps = parser.getint('video', 'fps')
+			if parser.has_option('game', 'record'):
+				self.record = parser.getboolean('game', 'record')
+			if parser.has_option('game', 'replays'):
+				self.replayDir = parser.get('game', 'replays')
+			if parser.has_option('video', 'profiles'):
+				self.profileDir = parser.get('video', 'profiles')
 		except Exception as e:
 			print(e)
 			self.writeSettings()
@@ -69,30 +122,108 @@ class State:
 
 
 def resume():
+	State().game.paused = False
 	State().current = State().game
 
-def startClassic():
+def record(game):
+	'Starts recording a replay of game when the settings ask for it'
+	state = State()
+	if state.record:
+		if not os.path.isdir(state.replayDir):
+			os.makedirs(state.replayDir)
+		name = time.strftime('%Y%m%d-%H%M%S-') + game.name + '.swr'
+		game.recorder = replay.Recorder(game, os.path.join(state.replayDir, name))
+
+def endGame():
+	'Saves the replay of the current game, if we were recording one'
+	game = State().game
+	if game is not None and game.recorder is not None:
+		game.recorder.save()
+
+def startClassic(players=2):
 	state = State()
-	game = g.Game(state)
+	endGame()
+	game = g.Game(state, players=players)
+	record(game)
 	state.game = game
 	state.current = game
 
 	if state.mainMenu.items[0].text != 'Resume':
 		state.mainMenu.items.insert(0, m.MenuItem('Resume', resume))
 
-def startRandom():
+def startRandom(players=2):
 	state = State()
-	game = g.RandomGame(state)
+	endGame()
+	game = g.RandomGame(state, players=players)
+	record(game)
 	state.game = game
 	state.current = game
 
 	if state.mainMenu.items[0].text != 'Resume':
 		state.mainMenu.items.insert(0, m.MenuItem('Resume', resume))
 
+def versusCpu():
+	'''Menu for a game against the computer, which plays the right ship
+	(the keyboard plays the left one)'''
+	# not at the top, games (which ai needs) imports us
+	import ai
+	state = State()
+	items = []
+	levels = [name.capitalize() for name in ai.levelNames]
+	levelOption = m.MenuValues('Difficulty', levels, levels.index('Normal'))
+	arenaOption = m.MenuValues('Arena', ['Classic', 'Random'], 0)
+
+	def start():
+		if arenaOption.curval == 0:
+			startClassic()
+		else:
+			startRandom()
+		state.game.controllers[1] = ai.Planner(ai.levelNames[levelOption.curval])
+
+	items.append(levelOption)
+	items.append(arenaOption)
+	items.append(m.MenuItem('Start', start))
+	items.append(m.MenuCancel('Cancel', newGame))
+	state.current = m.Menu(state, items)
+
+def freeForAll():
+	'''Menu for a game of up to 16 ships, the keyboard plays the first one
+	or two, then a ship for each gamepad and bots play the rest'''
+	# not at the top, games (which they need) imports us
+	import bots, gamepad
+	state = State()
+	items = []
+	counts = range(3, g.Game.maxPlayers + 1)
+	shipsOption = m.MenuValues('Ships', [str(count) for count in counts], counts.index(4))
+	keyboardOption = m.MenuValues('Keyboard players', ['0', '1', '2'], 1)
+	arenaOption = m.MenuValues('Arena', ['Classic', 'Random'], 0)
+
+	def start():
+		players = counts[shipsOption.curval]
+		if arenaOption.curval == 0:
+			startClassic(players)
+		else:
+			startRandom(players)
+		controllers = state.game.controllers
+		seats = range(keyboardOption.curval, players)
+		for pad, seat in zip(gamepad.connected(), seats):
+			controllers[seat] = pad
+		for seat in seats:
+			if controllers[seat] is None:
+				controllers[seat] = bots.Gunner(seat)
+
+	items.append(shipsOption)
+	items.append(keyboardOption)
+	items.append(arenaOption)
+	items.append(m.MenuItem('Start', start))
+	items.append(m.MenuCancel('Cancel', newGame))
+	state.current = m.Menu(state, items)
+
 def backToMainMenu():
 	State().current = State().mainMenu
 
 def quit():
+	endGame()
 	pygame.quit()
 	sys.exit()
 
@@ -101,6 +232,8 @@ def newGame():
 	items = []
 	items.append(m.MenuItem('Classic', startClassic))
 	items.append(m.MenuItem('Random', startRandom))
+	items.append(m.MenuItem('Versus CPU', versusCpu))
+	items.append(m.MenuItem('Free For All', freeForAll))
 	items.append(m.MenuItem('Main Menu', backToMainMenu))
 	state.current = m.Menu(state, items)
 
@@ -113,7 +246,6 @@ def videoOptions():
 		fullint = 1
 	fullscreenOption = m.MenuValues('Fullscreen', ['Off', 'On'], fullint)
 
-	ratios = ['4x3', '16x9', '16x10']
 	ratioint = ratios.index(state.ratio)
 	ratioOption = m.MenuValues('Aspect Ratio', ratios, ratioint)
 
@@ -127,22 +259,12 @@ def videoOptions():
 			elif fullscreenOption.curval == 1:
 				setfull = pygame.FULLSCREEN
 
-			# get aspect ratio value
-			setsize = state.size
-			if items[1].curval == 0:
-				setsize = (1024,768)
-			elif items[1].curval == 1:
-				setsize = (1280,720)
-			elif items[1].curval == 2:
-				setsize = (1280,800)
-
-			# apply changes
-			state.screen = pygame.display.set_mode(setsize, setfull)
+			# apply changes, only the window changes, the game is drawn
+			# at the same size and scaled to fit
+			state.ratio = ratios[ratioOption.curval]
 			state.fullscreen = setfull
-			if ratioint != ratioOption.curval and state.game != None:
-				state.game.resize(setsize[0], setsize[1])
-
-			state.size = (state.width, state.height) = setsize
+			state.window.setMode(state.windowSize(), setfull)
+			state.screen = state.window.surface
 			state.writeSettings()
 
 		backToMainMenu()
@@ -161,9 +283,14 @@ def main():
 
 	# setup the screen, double buffer and game clock
 	state = State()
-	state.screen = pygame.display.set_mode(state.size, state.fullscreen)
+	state.window = render.Window(state.size, state.windowSize(), state.fullscreen)
+	state.screen = state.window.surface
 	clock = pygame.time.Clock()
 
+	# load the fonts once, menus and games share them
+	fonts.get(m.Menu.fontsize, True)
+	fonts.get(12)
+
 	# create main menu
 	items = []
 	items.append(m.MenuItem('New Game', newGame))
@@ -175,18 +302,44 @@ def main():
 	mainMenu = m.Menu(state, items)
 	state.mainMenu = mainMenu
 	state.current = mainMenu
-	c.Movable.state = state
 
 
 	# core game loop
+	shown = None
+	profile = state.profiler
+	held = []
 	while True:
-		# do the loop for the current state (passing in state)
-		state.current.loop(state.screen)
+		# F3 toggles the profiler overlay, F4 saves the frames it timed
+		keys = pygame.key.get_pressed()
+		if keys[pygame.K_F3] and pygame.K_F3 not in held and profile.toggle():
+			state.current.invalidate()
+		if keys[pygame.K_F4] and pygame.K_F4 not in held:
+			name = profile.save(state.profileDir)
+			if name is not None:
+				print('saved frame timings to %s.csv and .json' % name)
+		held = [key for key in (pygame.K_F3, pygame.K_F4) if keys[key]]
+
+		# whatever we switched to has to draw the whole screen
+		if state.current is not shown:
+			shown = state.current
+			shown.invalidate()
 
-		# show stuff on screen
-		pygame.display.flip()
-
-		#do loop at 60 fps
-		clock.tick(60)
+		# do the loop for the current state (passing in state)
+		rects = state.current.loop(state.screen)
+		profile.mark('other')
+
+		overlay = profile.display(state.screen)
+		if overlay is not None and rects is not None:
+			rects.append(overlay)
+		profile.mark('overlay')
+
+		# show stuff on screen, only what changed if we know what that is
+		state.window.show(rects)
+		profile.mark('flip')
+
+		# frame rate cap, the game itself runs at state.tickRate
+		clock.tick(state.fps)
+		profile.mark('wait')
+		profile.endFrame()
 
 if __name__ == '__main__': main()
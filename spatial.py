@@ -0,0 +1,58 @@
+import math
+
+class SpatialHash:
+	'''Uniform grid over the playfield, used as collision broad phase.
+	The playfield wraps around (see Movable.update) so the grid does too'''
+
+	def __init__(self, width, height, cellsize=32):
+		# use a whole number of cells so wrapping lines up with the grid
+		self.cols = max(1, int(width // cellsize))
+		self.rows = max(1, int(height // cellsize))
+		self.cellw = width / float(self.cols)
+		self.cellh = height / float(self.rows)
+		self.cells = {}
+		self.count = 0
+
+	def clear(self):
+		self.cells.clear()
+		self.count = 0
+
+	def cellsFor(self, x, y, reach):
+		'Returns the (wrapped) grid cells covered by a circle'
+		x0 = int(math.floor((x - reach) / self.cellw))
+		x1 = int(math.floor((x + reach) / self.cellw))
+		y0 = int(math.floor((y - reach) / self.cellh))
+		y1 = int(math.floor((y + reach) / self.cellh))
+
+		# no need to visit a column or row twice when reach is huge
+		if x1 - x0 >= self.cols:
+			x0, x1 = 0, self.cols - 1
+		if y1 - y0 >= self.rows:
+			y0, y1 = 0, self.rows - 1
+
+		cols = self.cols
+		rows = self.rows
+		return [(cx % cols, cy % rows)
+			for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+	def insert(self, thing, reach):
+		'Adds thing to every cell within reach of its location'
+		entry = (self.count, thing)
+		self.count += 1
+		for cell in self.cellsFor(thing.x, thing.y, reach):
+			bucket = self.cells.get(cell)
+			if bucket is None:
+				self.cells[cell] = [entry]
+			else:
+				bucket.append(entry)
+
+	def nearby(self, thing, reach=0):
+		'''Returns the inserted things that may be within reach of thing,
+		in the order they were inserted'''
+		found = {}
+		for cell in self.cellsFor(thing.x, thing.y, reach):
+			bucket = self.cells.get(cell)
+			if bucket is not None:
+				for num, other in bucket:
+					found[num] = other
+		return [found[num] for num in sorted(found)]
@@ -0,0 +1,47 @@
+import pygame
+import classes as c
+
+class ShipSprites:
+	'''Ship images (with and without flame) pre-rendered at a fixed number
+	of angles for each color, so drawing a ship is a single blit'''
+
+	size = 25  # big enough for the ship and its flame at any angle
+	center = 12
+
+	def __init__(self, steps=72, antialias=True):
+		self.steps = steps
+		self.antialias = antialias
+		self.images = {}
+
+	def render(self, color, step, accel):
+		'Draws one image into the cache'
+		image = pygame.Surface((self.size, self.size), flags=pygame.SRCALPHA, depth=32)
+		image.fill((0,0,0,0))
+		rot = step * 360.0 / self.steps
+		center = (self.center, self.center)
+		c.Player.renderShip(image, center, rot, color, accel, self.antialias)
+		self.images[(color, step, accel)] = image
+		return image
+
+	def prepare(self, color):
+		'Renders all angles for a color up front (at game start)'
+		for step in range(self.steps):
+			for accel in (False, True):
+				if (color, step, accel) not in self.images:
+					self.render(color, step, accel)
+
+	def get(self, color, rot, accel=False):
+		step = int(round(rot * self.steps / 360.0)) % self.steps
+		accel = accel > 0
+		image = self.images.get((color, step, accel))
+		if image is None:
+			image = self.render(color, step, accel)
+		return image
+
+	def draw(self, surface, (x, y), rot, color, accel=False):
+		'Blits a ship centered on x, y, returns the rect drawn to'
+		image = self.get(color, rot, accel)
+		return surface.blit(image, (int(x) - self.center, int(y) - self.center))
+
+# shared by everything that draws ships
+ships = ShipSprites()
@@ -0,0 +1,214 @@
+import sys, os, json, itertools, multiprocessing, timeit
+import numpy as np
+import classes as c
+import games as g
+import bots
+import cli
+
+# one binary file per column (name.bin, little endian) and a manifest
+columns = [
+	('point', '<u2'),       # index into the manifest's points
+	('seed', '<u4'),
+	('bot1', 'u1'),         # index into the manifest's bots, per seat
+	('bot2', 'u1'),
+	('winner', 'i1'),       # seat that won, 0 for a tie, -1 ran out of ticks
+	('ticks', '<u4'),
+	('hits1', '<u2'),       # bullets that hit the ship in each seat
+	('hits2', '<u2'),
+	('deaths1', 'u1'),
+	('deaths2', 'u1'),
+	('wellDeaths1', 'u1'),
+	('wellDeaths2', 'u1')]
+
+# Player.use and Player.rate as the game ships them
+defaults = {'use': dict(c.Player.use), 'rate': dict(c.Player.rate)}
+
+def setBalance(params):
+	'Sets Player.use and Player.rate to the defaults changed by params'
+	for table in ('use', 'rate'):
+		values = getattr(c.Player, table)
+		values.clear()
+		values.update(defaults[table])
+	for name, value in params.items():
+		table, system = name.split('.')
+		getattr(c.Player, table)[system] = value
+
+def play(task):
+	'Plays one headless match between two bots, returns its row'
+	point, params, seed, seats, botNames, gameType, maxTicks = task
+	setBalance(params)
+	game = g.types[gameType](g.Arena(), True, seed)
+	players = [bots.types[botNames[seat]](seed * 2 + i) for i, seat in enumerate(seats)]
+
+	ticks = 0
+	while game.winner == False and ticks < maxTicks:
+		game.step([bot.act(game, i) for i, bot in enumerate(players)])
+		ticks += 1
+
+	one, two = game.players
+	if game.winner == False:
+		winner = -1
+	elif one.lives < 0 and two.lives < 0:
+		winner = 0
+	else:
+		winner = 2 if one.lives < 0 else 1
+	# everyone starts with 3 lives left and the last one is -1
+	return (point, seed, seats[0], seats[1], winner, ticks, one.hits, two.hits,
+		3 - max(one.lives, -1), 3 - max(two.lives, -1), one.wellDeaths, two.wellDeaths)
+
+
+class ColumnWriter:
+	'Appends rows to the column files in a directory, a batch at a time'
+
+	batch = 1000
+
+	def __init__(self, path, manifest):
+		self.path = path
+		if not os.path.isdir(path):
+			os.makedirs(path)
+		self.manifest = manifest
+		manifest['columns'] = columns
+		manifest['rows'] = 0
+		self.rows = []
+		self.files = [open(os.path.join(path, name + '.bin'), 'wb') for name, dtype in columns]
+
+	def add(self, row):
+		self.rows.append(row)
+		if len(self.rows) >= ColumnWriter.batch:
+			self.flush()
+
+	def flush(self):
+		if self.rows:
+			for file, values, (name, dtype) in zip(self.files, zip(*self.rows), columns):
+				np.array(values, dtype=dtype).tofile(file)
+				file.flush()
+			self.manifest['rows'] += len(self.rows)
+			self.rows = []
+		# rewritten every time, a sweep that is cut short can still be read
+		file = open(os.path.join(self.path, 'manifest.json'), 'w')
+		json.dump(self.manifest, file, indent=1)
+		file.close()
+
+	def close(self):
+		self.flush()
+		for file in self.files:
+			file.close()
+
+def load(path):
+	'Reads a sweep back as its manifest and a dict of column arrays'
+	file = open(os.path.join(path, 'manifest.json'))
+	manifest = json.load(file)
+	file.close()
+	data = {}
+	for name, dtype in manifest['columns']:
+		data[name] = np.fromfile(os.path.join(path, name + '.bin'), dtype=dtype,
+			count=manifest['rows'])
+	return manifest, data
+
+
+def summary(manifest, data):
+	'Prints a table with a line per parameter set'
+	names = sorted(manifest['points'][0]) if manifest['points'] else []
+	botNames = manifest['bots']
+	tickRate = 60.0
+
+	header = ['%12s' % name for name in names] + ['%8s' % 'matches'] + \
+		['%9s' % (name + ' %') for name in botNames] + \
+		['%7s' % 'tie %', '%7s' % 'none %', '%8s' % 'secs', '%6s' % 'hits', '%7s' % 'deaths', '%7s' % 'well %']
+	print(' '.join(header))
+
+	for point, params in enumerate(manifest['points']):
+		rows = data['point'] == point
+		count = np.count_nonzero(rows)
+		if count == 0:
+			continue
+		winner = data['winner'][rows]
+		# which bot (not which seat) won
+		won = np.where(winner == 1, data['bot1'][rows], np.where(winner == 2, data['bot2'][rows], -1))
+		deaths = data['deaths1'][rows].astype(int) + data['deaths2'][rows]
+		wells = data['wellDeaths1'][rows].astype(int) + data['wellDeaths2'][rows]
+		hits = data['hits1'][rows].astype(int) + data['hits2'][rows]
+
+		line = ['%12g' % params[name] for name in names] + ['%8d' % count]
+		line += ['%9.1f' % (100.0 * np.count_nonzero(won == i) / count) for i in range(len(botNames))]
+		line += ['%7.1f' % (100.0 * np.count_nonzero(winner == 0) / count),
+			'%7.1f' % (100.0 * np.count_nonzero(winner == -1) / count),
+			'%8.1f' % (data['ticks'][rows].mean() / tickRate),
+			'%6.1f' % hits.mean(), '%7.2f' % deaths.mean(),
+			'%7.1f' % (100.0 * wells.sum() / max(deaths.sum(), 1))]
+		print(' '.join(line))
+
+
+def grid(settings):
+	'''Every combination of the values in settings, a list of strings
+	like "use.ammo=2,3,4", as a list of dicts'''
+	names = []
+	values = []
+	for setting in settings:
+		name, options = setting.split('=')
+		table, system = name.split('.')
+		if table not in defaults or system not in defaults[table]:
+			raise ValueError('%s is not in Player.use or Player.rate' % name)
+		names.append(name)
+		values.append([float(value) for value in options.split(',')])
+	return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+def sweep(points, matches, botNames, gameType, maxTicks, path, workers=None, seed=0):
+	'''Plays matches for every point of the grid on a pool of processes,
+	the bots take turns in each seat'''
+	manifest = {'points': points, 'bots': botNames, 'game': gameType,
+		'ticks': maxTicks, 'seed': seed}
+	writer = ColumnWriter(path, manifest)
+	total = len(points) * matches
+
+	def tasks():
+		for point, params in enumerate(points):
+			for i in range(matches):
+				seats = (0, 1) if i % 2 == 0 else (1, 0)
+				yield (point, params, seed + point * matches + i, seats, botNames, gameType, maxTicks)
+
+	pool = multiprocessing.Pool(workers)
+	start = shown = timeit.default_timer()
+	done = 0
+	try:
+		for row in pool.imap_unordered(play, tasks(), chunksize=8):
+			writer.add(row)
+			done += 1
+			now = timeit.default_timer()
+			if now - shown > 2 or done == total:
+				shown = now
+				rate = done / (now - start)
+				sys.stderr.write('\r%d/%d matches, %.1f a second, %ds left   ' %
+					(done, total, rate, (total - done) / max(rate, 1e-9)))
+	finally:
+		pool.terminate()
+		writer.close()
+		sys.stderr.write('\n')
+	return manifest
+
+
+def main(args):
+	'''python sweep.py [--set use.ammo=2,3,4]... [--matches N] [--bots gunner,dodger]
+	                   [--game random] [--ticks N] [--workers N] [--seed N] [--out dir]
+	python sweep.py --summary dir
+	plays matches between bots for every combination of Player.use and
+	Player.rate values, saves a row per match and prints a summary'''
+	option = cli.options(args)
+
+	if '--summary' in args:
+		summary(*load(option('--summary', None, str)))
+		return
+
+	settings = [args[i + 1] for i, arg in enumerate(args) if arg == '--set']
+	points = grid(settings)
+	botNames = option('--bots', 'gunner,dodger', str).split(',')
+	for name in botNames:
+		if name not in bots.types:
+			raise ValueError('no bot called %s, there are %s' % (name, ', '.join(sorted(bots.types))))
+	path = option('--out', 'sweep', str)
+
+	sweep(points, option('--matches', 100), botNames, option('--game', 'random', str),
+		option('--ticks', 5400), path, option('--workers', None), option('--seed', 0))
+	summary(*load(path))
+
+if __name__ == '__main__': main(sys.argv[1:])
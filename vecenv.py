@@ -0,0 +1,610 @@
+import sys, timeit
+import numpy as np
+import classes as c
+import games as g
+import bullets as b
+
+class VecEnv:
+	'''Many independent two player games stepped together, every ship,
+	well and bullet of all of them kept in NumPy arrays (one row per
+	game), with a gym style reset / step.
+
+	The rules are those of Player, GravityWell and BulletField as Game.step
+	runs them, in the same order: ship actions, each ship colliding and
+	moving in turn with the wells pulling before (random layouts) or after
+	(classic) them, then bullets. Differences with the real game:
+	  - a ship can have shipBullets bullets flying, shots beyond that are lost
+	  - hyperjumps use the env's own random numbers
+	  - exploding bullets are dropped right away, they only ever show
+
+	Actions are the bitmasks of games (ROTATE_LEFT, THRUST, SHOOT, ...),
+	one per ship: an (n, 2) array. Observations are (n, 2, size) float32,
+	each ship's view of the game (see observe), rewards are (n, 2).'''
+
+	players = 2
+	# wells for a world of one screen, bigger ones have more (see __init__)
+	maxWells = g.RandomGame.maxWells
+	shipBullets = 64
+	maxBullets = players * shipBullets
+	# bullets (of the other ship) in an observation, closest first
+	seenBullets = 8
+	observationSize = 18 + 9 + 4 * maxWells + 4 * seenBullets
+
+	# rewards: for each life the other ship loses (minus for our own)
+	# and for each bullet of ours that hit it (minus for getting hit)
+	lifeReward = 1.0
+	hitReward = 0.1
+
+	systems = ['hull', 'ammo', 'shield', 'engine', 'jump']
+
+	# where wells that are not there are, too far away to ever hit
+	nowhere = -1e6
+
+	def __init__(self, count, game='random', width=1024, height=768, maxTicks=3600, seed=0):
+		self.count = count
+		self.gameType = game
+		self.width = float(width)
+		self.height = float(height)
+		self.arena = g.Arena(width, height)
+
+		# room (and observations) for the most wells a world this big has
+		self.maxWells = VecEnv.maxWells * g.RandomGame.screens(width, height)
+		self.observationSize = 18 + 9 + 4 * self.maxWells + 4 * VecEnv.seenBullets
+		self.maxTicks = maxTicks
+		self.seed = seed
+		self.random = np.random.RandomState(seed)
+		self.episodes = 0
+
+		# the wells pull the ships before their turn when they come first in things
+		self.wellsFirst = game == 'random'
+		self.use = dict(c.Player.use)
+		self.rate = np.array([c.Player.rate[name] for name in VecEnv.systems])
+
+		n, p, w, m = count, VecEnv.players, self.maxWells, VecEnv.maxBullets
+		self.seeds = np.zeros(n, dtype=np.int64)
+		self.ticks = np.zeros(n, dtype=np.int64)
+
+		# ships, [game, seat]
+		self.x = np.zeros((n, p))
+		self.y = np.zeros((n, p))
+		self.vx = np.zeros((n, p))
+		self.vy = np.zeros((n, p))
+		self.rot = np.zeros((n, p))
+		self.lives = np.zeros((n, p), dtype=np.int64)
+		self.system = dict((name, np.zeros((n, p))) for name in VecEnv.systems)
+		self.rates = np.zeros((n, p, len(VecEnv.systems))) # recharge, see Player.energy
+		self.current = np.zeros((n, p), dtype=np.int64) # selected system
+		self.shooting = np.zeros((n, p), dtype=np.int64)
+		self.shieldUp = np.zeros((n, p), dtype=np.int64)
+		self.origX = np.zeros((n, p))
+		self.origY = np.zeros((n, p))
+		self.origRot = np.zeros((n, p))
+		self.hits = np.zeros((n, p), dtype=np.int64) # times hit this episode
+
+		# wells, [game, well], unused ones are nowhere and have no force
+		# (views of one array, so fly can pick out a bullet's wells at once)
+		self.wellData = np.zeros((4, w, n))
+		self.wx, self.wy, self.wrad, self.wforce = [data.T for data in self.wellData]
+		self.wells = np.zeros((n, w), dtype=bool)
+
+		# bullets, [game, slot], a slot is free when ttl is not above 0,
+		# each ship has its own shipBullets slots one after the other
+		self.bx = np.zeros((n, m))
+		self.by = np.zeros((n, m))
+		self.bvx = np.zeros((n, m))
+		self.bvy = np.zeros((n, m))
+		self.ttl = np.zeros((n, m), dtype=np.int64)
+
+		self.rows = np.arange(n)
+
+	def layout(self, env, seed):
+		'''Sets up one game like the real game of our type with this seed
+		would start out, wells and ships in the same places'''
+		game = g.types[self.gameType](self.arena, True, seed)
+		self.seeds[env] = seed
+		self.ticks[env] = 0
+		for i, player in enumerate(game.players):
+			self.x[env, i] = self.origX[env, i] = player.x
+			self.y[env, i] = self.origY[env, i] = player.y
+			self.rot[env, i] = self.origRot[env, i] = player.rot
+		self.vx[env] = self.vy[env] = 0
+		self.lives[env] = 3
+		for name in VecEnv.systems:
+			self.system[name][env] = 100
+		self.rates[env] = self.rate
+		self.current[env] = 0
+		self.shooting[env] = self.shieldUp[env] = self.hits[env] = 0
+
+		self.wells[env] = False
+		self.wx[env] = self.wy[env] = VecEnv.nowhere
+		self.wforce[env] = 0
+		self.wrad[env] = 0
+		for k, well in enumerate(game.wells):
+			self.wx[env, k] = well.x
+			self.wy[env, k] = well.y
+			self.wrad[env, k] = well.rad
+			self.wforce[env, k] = well.force
+			self.wells[env, k] = True
+		self.ttl[env] = 0
+		self.episodes += 1
+
+	def reset(self, seeds=None):
+		'Starts every game over, returns the observations'
+		if seeds is None:
+			seeds = self.random.randint(0, 1 << 31, self.count)
+		for env in range(self.count):
+			self.layout(env, int(seeds[env]))
+		return self.observe()
+
+	def push(self, rows, seat, dx, dy):
+		'Player.push for the ship in seat of the games in rows (a mask)'
+		vx = self.vx[:, seat] + np.where(rows, dx, 0.0)
+		vy = self.vy[:, seat] + np.where(rows, dy, 0.0)
+		speed = vx * vx + vy * vy
+		cap = rows & (speed > 25)
+		scale = np.where(cap, 5 / np.sqrt(np.where(cap, speed, 1.0)), 1.0)
+		self.vx[:, seat] = vx * scale
+		self.vy[:, seat] = vy * scale
+
+	def move(self, rows, seat):
+		'Movable.update for the ship in seat of the games in rows'
+		x = self.x[:, seat] + np.where(rows, self.vx[:, seat], 0.0)
+		y = self.y[:, seat] + np.where(rows, self.vy[:, seat], 0.0)
+		self.x[:, seat] = np.where(x > self.width, 0, np.where(x < 0, self.width, x))
+		self.y[:, seat] = np.where(y > self.height, 0, np.where(y < 0, self.height, y))
+
+	def respawn(self, rows, seat):
+		'Player.reset'
+		self.lives[rows, seat] -= 1
+		self.x[rows, seat] = self.origX[rows, seat]
+		self.y[rows, seat] = self.origY[rows, seat]
+		self.rot[rows, seat] = self.origRot[rows, seat]
+		self.vx[rows, seat] = 0
+		self.vy[rows, seat] = 0
+		for name in VecEnv.systems:
+			self.system[name][rows, seat] = 100
+		self.rates[rows, seat] = self.rate
+
+	def act(self, actions):
+		'The action part of Game.step, for both ships at once'
+		system = self.system
+		for bit, val in ((g.NEXT_SYSTEM, 1), (g.PREV_SYSTEM, -1)):
+			self.current = np.where((actions & bit) != 0, (self.current + val) % 5, self.current)
+
+		for bit, val in ((g.ROTATE_RIGHT, 5), (g.ROTATE_LEFT, -5)):
+			rows = (actions & bit) != 0
+			rot = self.rot + np.where(rows, val, 0)
+			self.rot = np.where(rot > 360, rot - 360, np.where(rot < -360, rot + 360, rot))
+
+		for bit, val in ((g.THRUST, 0.25), (g.REVERSE, -0.1)):
+			rows = ((actions & bit) != 0) & (system['engine'] > 5)
+			if rows.any():
+				rad = np.radians(self.rot)
+				for seat in range(VecEnv.players):
+					self.push(rows[:, seat], seat, np.cos(rad[:, seat]) * val, np.sin(rad[:, seat]) * val)
+				system['engine'] -= np.where(rows, self.use['engine'], 0)
+
+		rows = ((actions & g.SHOOT) != 0) & (self.shooting == 0) & (system['ammo'] >= 2)
+		if rows.any():
+			for seat in range(VecEnv.players):
+				self.shoot(rows[:, seat], seat)
+			self.shooting[rows] = 3
+			system['ammo'] -= np.where(rows, self.use['ammo'], 0)
+
+		rows = ((actions & g.JUMP) != 0) & (system['jump'] >= 75)
+		if rows.any():
+			count = np.count_nonzero(rows)
+			self.x[rows] = self.random.randint(0, int(self.width), count)
+			self.y[rows] = self.random.randint(0, int(self.height), count)
+			system['jump'] -= np.where(rows, self.use['jump'], 0)
+
+		rows = ((actions & g.SHIELD) != 0) & (system['shield'] >= 2)
+		self.shieldUp[rows] = 2
+		system['shield'] -= np.where(rows, self.use['shield'], 0)
+
+		for bit, val in ((g.ENERGY_DOWN, -1), (g.ENERGY_UP, 1)):
+			rows = (actions & bit) != 0
+			if rows.any():
+				self.rates[rows] = c.rebalance(self.rates[rows], self.current[rows], val)
+
+	def shoot(self, rows, seat):
+		'Player.shoot and BulletField.spawn, into the first free slot of the ship'
+		first = seat * VecEnv.shipBullets
+		slot = np.argmin(self.ttl[:, first:first + VecEnv.shipBullets] > 0, axis=1) + first
+		rows = rows & (self.ttl[self.rows, slot] <= 0)
+		env = self.rows[rows]
+		slot = slot[rows]
+		rad = np.radians(self.rot[env, seat])
+		dx = np.cos(rad)
+		dy = np.sin(rad)
+		vx = self.vx[env, seat] + dx * 3.5
+		vy = self.vy[env, seat] + dy * 3.5
+		x = self.x[env, seat] + dx * 7 + vx
+		y = self.y[env, seat] + dy * 7 + vy
+		self.bx[env, slot] = np.where(x > self.width, 0, np.where(x < 0, self.width, x))
+		self.by[env, slot] = np.where(y > self.height, 0, np.where(y < 0, self.height, y))
+		self.bvx[env, slot] = vx
+		self.bvy[env, slot] = vy
+		self.ttl[env, slot] = b.BulletField.life - 1
+
+	def pull(self):
+		'GravityWell.update for all wells, in order'
+		for k in range(self.maxWells):
+			wells = self.wells[:, k]
+			if not wells.any():
+				continue
+			force = self.wforce[:, k]
+			for seat in range(VecEnv.players):
+				dx = self.wx[:, k] - self.x[:, seat]
+				dy = self.wy[:, k] - self.y[:, seat]
+				dist = dx * dx + dy * dy
+				scale = 2 * force / np.where(dist != 0, dist, 1.0)
+				self.push(wells, seat, np.where(dist != 0, dx * scale, force), dy * scale)
+
+	def crash(self, seat):
+		'Player.checkCollision against the other ship'
+		other = 1 - seat
+		dx = self.x[:, seat] - self.x[:, other]
+		dy = self.y[:, seat] - self.y[:, other]
+		mine = self.shieldUp[:, seat] > 0
+		theirs = self.shieldUp[:, other] > 0
+		dist = np.hypot(dx, dy) - 2 * 5 - np.where(mine, 5, 0) - np.where(theirs, 5, 0)
+		rows = dist <= 0
+		if not rows.any():
+			return
+
+		vx, vy = self.vx[:, seat].copy(), self.vy[:, seat].copy()
+		ovx, ovy = self.vx[:, other].copy(), self.vy[:, other].copy()
+		damage = np.hypot(vx - ovx, vy - ovy) * 5
+		# the ships swap velocities, a ship without its shield up only
+		# gets half and takes the damage
+		keep = np.where(mine, 1.0, 0.5)
+		give = np.where(theirs, 1.0, 0.5)
+		self.vx[:, seat] = np.where(rows, ovx * keep, vx)
+		self.vy[:, seat] = np.where(rows, ovy * keep, vy)
+		self.vx[:, other] = np.where(rows, vx * give, ovx)
+		self.vy[:, other] = np.where(rows, vy * give, ovy)
+		hull = self.system['hull']
+		hull[:, seat] -= np.where(rows & ~mine, damage, 0)
+		hull[:, other] -= np.where(rows & ~theirs, damage, 0)
+		self.move(rows, seat)
+		self.move(rows, other)
+
+	def fall(self, seat):
+		'Player.checkCollision against the wells'
+		for k in range(self.maxWells):
+			dx = self.x[:, seat] - self.wx[:, k]
+			dy = self.y[:, seat] - self.wy[:, k]
+			rows = np.hypot(dx, dy) <= self.wrad[:, k]
+			if rows.any():
+				self.respawn(rows, seat)
+
+	def update(self, seat):
+		'Player.update'
+		everyone = np.ones(self.count, dtype=bool)
+		self.move(everyone, seat)
+		for counter in (self.shooting, self.shieldUp):
+			counter[:, seat] -= counter[:, seat] > 0
+		dead = self.system['hull'][:, seat] <= 0
+		if dead.any():
+			self.respawn(dead, seat)
+		for k, name in enumerate(VecEnv.systems):
+			values = self.system[name][:, seat]
+			values += np.where(values < 100, self.rates[:, seat, k], 0.0)
+
+	def fly(self):
+		'''BulletField applyGravity, collide and update, done on a flat list
+		of the live bullets of all games rather than on every slot'''
+		live = np.flatnonzero(self.ttl > 0)
+		if len(live) == 0:
+			return
+		env = live // VecEnv.maxBullets
+		x = self.bx.take(live)
+		y = self.by.take(live)
+		vx = self.bvx.take(live)
+		vy = self.bvy.take(live)
+
+		# [well, bullet], wells that are not there are far away with no force
+		# (bullets last, numpy is slow going along a short last axis)
+		n, w = self.count, self.maxWells
+		wx, wy, rad, force = self.wellData.reshape(4 * w, n).take(env, axis=1).reshape(4, w, -1)
+		dx = wx - x
+		dy = wy - y
+		dist = dx * dx + dy * dy
+		with np.errstate(divide='ignore', invalid='ignore'):
+			scale = 2 * force / dist
+		ax = dx * scale
+		ay = dy * scale
+		# on top of a well, see gravity.exact
+		still = dist == 0
+		if still.any():
+			ax[still] = force[still]
+			ay[still] = 0
+		for k in range(w):
+			vx += ax[k]
+			vy += ay[k]
+		wells = dist <= rad * rad
+
+		# [seat, bullet], nothing moves while bullets hit things
+		shield = self.shieldUp > 0
+		dx = x - self.x.T.take(env, axis=1)
+		dy = y - self.y.T.take(env, axis=1)
+		ships = dx * dx + dy * dy <= np.where(shield, 12 * 12, 5 * 5).T.take(env, axis=1)
+
+		# targets in the order of Game.things
+		targets = [(ships, seat) for seat in range(VecEnv.players)]
+		targets = [(wells, k) for k in range(self.maxWells)] + targets if self.wellsFirst else \
+			targets + [(wells, k) for k in range(self.maxWells)]
+		alive = np.ones(len(live), dtype=bool)
+		for hits, i in targets:
+			hit = alive & hits[i]
+			if not hit.any():
+				continue
+			alive &= ~hit
+			if hits is ships:
+				count = np.bincount(env[hit], minlength=self.count)
+				strength = np.where(shield[:, i], 5.0, 10.0)
+				self.push(count > 0, i, np.bincount(env[hit], vx[hit], self.count) / strength,
+					np.bincount(env[hit], vy[hit], self.count) / strength)
+				self.system['hull'][:, i] -= np.where(shield[:, i], 0, 25 * count)
+				self.hits[:, i] += np.where(shield[:, i], 0, count)
+
+		x += vx
+		y += vy
+		x[x > self.width] = 0
+		x[x < 0] = self.width
+		y[y > self.height] = 0
+		y[y < 0] = self.height
+		self.bx.put(live, x)
+		self.by.put(live, y)
+		self.bvx.put(live, vx)
+		self.bvy.put(live, vy)
+		self.ttl.put(live, np.where(alive, self.ttl.take(live) - 1, 0))
+
+	def step(self, actions):
+		'''Runs a tick of every game given (n, 2) action bitmasks, returns
+		observations, rewards, dones and info (the winner of each game: 1 or
+		2, 0 for a tie, -1 for none) like a gym vector env: games that ended
+		are started over right away'''
+		actions = np.asarray(actions, dtype=np.int64).reshape(self.count, VecEnv.players)
+		lives = self.lives.copy()
+		hits = self.hits.copy()
+
+		self.act(actions)
+		if self.wellsFirst:
+			self.pull()
+		for seat in range(VecEnv.players):
+			if self.wellsFirst:
+				self.fall(seat)
+				self.crash(seat)
+			else:
+				self.crash(seat)
+				self.fall(seat)
+			self.update(seat)
+		if not self.wellsFirst:
+			self.pull()
+		self.fly()
+		self.ticks += 1
+
+		lost = lives - self.lives
+		taken = self.hits - hits
+		rewards = VecEnv.lifeReward * (lost[:, ::-1] - lost) + VecEnv.hitReward * (taken[:, ::-1] - taken)
+
+		# like sweep: the seat that won, 0 for a tie, -1 for none (yet)
+		out = self.lives < 0
+		winner = np.where(out[:, 0] & out[:, 1], 0, np.where(out[:, 0], 2, np.where(out[:, 1], 1, -1)))
+		dones = (winner >= 0) | (self.ticks >= self.maxTicks)
+		for env in np.nonzero(dones)[0]:
+			self.layout(env, int(self.random.randint(0, 1 << 31)))
+		return self.observe(), rewards.astype(np.float32), dones, {'winner': winner}
+
+	def observe(self):
+		'''What each ship sees, relative to itself and scaled to about -1..1:
+		itself (velocity, heading, systems, lives, cooldowns, recharge rates
+		and the selected system), the other ship
+		(where, how fast, heading, hull, shield, lives), the wells (where,
+		size, force) and the closest bullets of the other ship'''
+		# [game, seat] arrays, and the same for the other ship in each seat
+		rad = np.radians(self.rot)
+		vx, vy = self.vx, self.vy
+		ovx, ovy = vx[:, ::-1], vy[:, ::-1]
+		features = [vx / 5, vy / 5, np.cos(rad), np.sin(rad)]
+		features += [self.system[name] / 100.0 for name in VecEnv.systems]
+		features += [self.lives / 3.0, self.shooting / 3.0, self.shieldUp / 2.0]
+		features += [self.rates[:, :, k] / (self.rate[k] * 2) for k in range(len(VecEnv.systems))]
+		features += [self.current / 4.0]
+		features += [
+			c.wrapped(self.x[:, ::-1] - self.x, self.width) / self.width,
+			c.wrapped(self.y[:, ::-1] - self.y, self.height) / self.height,
+			(ovx - vx) / 5, (ovy - vy) / 5,
+			np.cos(rad[:, ::-1]), np.sin(rad[:, ::-1]),
+			self.system['hull'][:, ::-1] / 100.0,
+			self.shieldUp[:, ::-1] / 2.0, self.lives[:, ::-1] / 3.0]
+
+		# [game, seat, well]
+		x = self.x[:, :, None]
+		y = self.y[:, :, None]
+		wells = self.wells[:, None, :]
+		wx = np.where(wells, c.wrapped(self.wx[:, None, :] - x, self.width) / self.width, 0)
+		wy = np.where(wells, c.wrapped(self.wy[:, None, :] - y, self.height) / self.height, 0)
+		size = np.broadcast_to(np.where(wells, self.wrad[:, None, :] / 30.0, 0), wx.shape)
+		force = np.broadcast_to(np.where(wells, self.wforce[:, None, :] / 7.5, 0), wx.shape)
+		for k in range(self.maxWells):
+			features += [wx[:, :, k], wy[:, :, k], size[:, :, k], force[:, :, k]]
+		obs = np.stack(features, axis=-1)
+
+		# [game, seat, bullet], the closest live bullets of the other ship,
+		# new bullets go in a ship's first free slot so the last ones are
+		# mostly empty and can be left out
+		n, slots, seen = self.count, VecEnv.shipBullets, VecEnv.seenBullets
+		live = (self.ttl > 0).reshape(n, VecEnv.players, slots)
+		used = live.any(axis=0).any(axis=0)
+		top = max(seen, slots - np.argmax(used[::-1]) if used.any() else 0)
+		live = live[:, ::-1, :top]
+		shape = (n, VecEnv.players, slots)
+		bx = self.bx.reshape(shape)[:, ::-1, :top]
+		by = self.by.reshape(shape)[:, ::-1, :top]
+		dx = c.wrapped(bx - x, self.width)
+		dy = c.wrapped(by - y, self.height)
+		dist = np.where(live, dx * dx + dy * dy, np.inf)
+		closest = np.argpartition(dist, seen - 1, axis=-1)[:, :, :seen]
+		rows = self.rows[:, None, None]
+		seats = np.arange(VecEnv.players)[None, :, None]
+		closest = closest[rows, seats, np.argsort(dist[rows, seats, closest], axis=-1)]
+		pick = rows, seats, closest
+		bvx = self.bvx.reshape(shape)[:, ::-1, :top]
+		bvy = self.bvy.reshape(shape)[:, ::-1, :top]
+		bullets = [dx[pick] / self.width, dy[pick] / self.height,
+			(bvx[pick] - vx[:, :, None]) / 5, (bvy[pick] - vy[:, :, None]) / 5]
+		bullets = np.where(live[pick][:, :, None, :], np.stack(bullets, axis=2), 0)
+		bullets = bullets.reshape(n, VecEnv.players, 4 * seen)
+		return np.concatenate((obs, bullets), axis=-1).astype(np.float32)
+
+
+def compare(count=64, ticks=600, game='random', seed=0):
+	'''Plays the same random (no hyperjump) inputs in the env and in real
+	games until they end, returns how many games played out the same and
+	the largest distance between a ship in both'''
+	import bots, snapshot
+	env = VecEnv(count, game, maxTicks=ticks + 1, seed=seed)
+	seeds = np.arange(count) + seed
+	env.reset(seeds)
+	games = [g.types[game](g.Arena(), True, int(s)) for s in seeds]
+	players = [[bots.RandomBot(int(s) * 2 + i) for i in range(2)] for s in seeds]
+	for bot in players:
+		bot[0].bits = bot[1].bits = [g.ROTATE_LEFT, g.ROTATE_RIGHT, g.THRUST, g.REVERSE, g.SHOOT, g.SHIELD,
+			g.ENERGY_UP, g.ENERGY_DOWN, g.NEXT_SYSTEM, g.PREV_SYSTEM]
+
+	worst = np.zeros(count)
+	same = np.ones(count, dtype=bool)
+	playing = np.ones(count, dtype=bool)
+	for tick in range(ticks):
+		actions = np.array([[bot.act() for bot in pair] for pair in players])
+		for game, action in zip(games, actions):
+			game.step(list(action))
+		obs, rewards, dones, info = env.step(actions)
+
+		# snapshot codes are 1 for a tie, 2 and 3 for the seats
+		codes = np.array([snapshot.winnerCode(game) for game in games])
+		winner = np.where(codes == 1, 0, codes - 1)
+		same &= ~playing | ((codes > 0) == dones) & (~dones | (winner == info['winner']))
+		playing &= ~dones
+
+		x = np.array([[p.x for p in game.players] for game in games])
+		y = np.array([[p.y for p in game.players] for game in games])
+		lives = np.array([[p.lives for p in game.players] for game in games])
+		apart = np.where(playing, np.hypot(x - env.x, y - env.y).max(axis=1), 0)
+		worst = np.maximum(worst, apart)
+		same &= ~playing | (lives == env.lives).all(axis=1)
+		rates = np.array([[[p.rate[name] for name in VecEnv.systems] for p in game.players] for game in games])
+		same &= ~playing | (rates == env.rates).all(axis=2).all(axis=1)
+	same &= worst < 1e-6
+	return np.count_nonzero(same), worst.max()
+
+def speed(count=1024, ticks=300, game='random'):
+	'''Env ticks a second for bots that keep changing their keys, timed
+	once the games are under way (and have bullets flying)'''
+	env = VecEnv(count, game, maxTicks=1 << 30)
+	env.reset()
+	rng = np.random.RandomState(1)
+	bits = np.array([g.ROTATE_LEFT, g.ROTATE_RIGHT, g.THRUST, g.SHOOT, g.SHIELD])
+	actions = [np.zeros((count, 2), dtype=np.int64)]
+	for tick in range(2 * ticks):
+		change = rng.rand(count, 2) < 0.05
+		fresh = (rng.rand(count, 2, len(bits)) < 0.3).dot(bits)
+		actions.append(np.where(change, fresh, actions[-1]))
+
+	for tick in range(ticks):
+		env.step(actions[tick])
+	start = timeit.default_timer()
+	for tick in range(ticks, 2 * ticks):
+		env.step(actions[tick])
+	return count * ticks / (timeit.default_timer() - start)
+
+
+def checkEnergy(ships=5000, moves=20000, seed=0):
+	'''Moves energy on random rates the game can get to, rebalance (which
+	Player.energy uses too) must keep rates in 0-100% and the total the
+	same, and agree with how energy was moved before: reference below,
+	trying the others in order and starting over without the first that
+	can't'''
+	def adjust(rate, systemnum, amount, test=False):
+		'The old Player.__adjustenergy on a dict of rates'
+		system = c.Player.system.reverse[systemnum]
+		percent = rate[system] / (c.Player.rate[system] / 50)
+		added = amount
+		if percent + amount > 100:
+			added = 100 - percent
+			percent = 100
+		elif percent + amount < 0:
+			added = -percent
+			percent = 0
+		else:
+			percent += amount
+		if test != True:
+			rate[system] = percent * (c.Player.rate[system] / 50)
+		return added
+
+	def reference(rate, cursysnum, amount):
+		'The old Player.energy on a dict of rates'
+		toadd = adjust(rate, cursysnum, amount, test=True)
+		if toadd == 0:
+			return
+		ignored = [cursysnum]
+		removed = False
+		while not removed:
+			share = float(-toadd) / (5 - len(ignored))
+			cando = True
+			for i in range(5):
+				if i not in ignored:
+					if adjust(rate, i, share, test=True) != share:
+						ignored.append(i)
+						cando = False
+						break
+			if cando:
+				for i in range(5):
+					if i not in ignored:
+						adjust(rate, i, share)
+				removed = True
+		adjust(rate, cursysnum, toadd)
+
+	rng = np.random.RandomState(seed)
+	names = [c.Player.system.reverse[i] for i in range(5)]
+	scale = np.array([c.Player.rate[name] for name in names]) / 50
+	rates = np.tile(scale * 50, (ships, 1))
+	for i in range(100):
+		rates = c.rebalance(rates, rng.randint(0, 5, ships), rng.choice([-3, -1, 1, 3], ships))
+
+	current = rng.randint(0, 5, ships)
+	amount = rng.choice([-7, -1, 1, 2.5], ships)
+	after = c.rebalance(rates, current, amount)
+	percent = after / scale
+	assert (percent >= 0).all() and (percent <= 100).all()
+	assert np.allclose(percent.sum(axis=1), 250)
+	for ship in range(ships):
+		old = dict(zip(names, rates[ship]))
+		reference(old, current[ship], amount[ship])
+		assert [old[name] for name in names] == list(after[ship])
+
+	# and a ship along the way there, from the rates it starts with
+	player = c.Player(g.Arena(), (255,255,255,255), 0, 0, 0, 'left')
+	old = dict(player.rate)
+	for i in range(moves):
+		player.cursysnum = rng.randint(0, 5)
+		step = rng.choice([-3, -1, 1, 3])
+		player.energy(step)
+		reference(old, player.cursysnum, step)
+		assert player.rate == old
+
+
+if __name__ == '__main__':
+	# python vecenv.py [envs]: checks the rules against the real game, then speed
+	checkEnergy()
+	print('5000 ships and 20000 moves rebalanced the same as before, '
+		'rates within 0-100% and totals kept')
+	for game in ('classic', 'random'):
+		same, worst = compare(game=game)
+		print('%s: %d of 64 games played the same as the real game for 600 ticks, '
+			'ships at most %.3g apart' % (game, same, worst))
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+	print('%d env ticks a second with %d envs' % (speed(count), count))